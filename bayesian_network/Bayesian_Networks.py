@@ -18,13 +18,18 @@ Notes
 
 from __future__ import annotations
 
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
-
 import glob
+import hashlib
+import json
 import os
-import pandas as pd
+from collections import namedtuple
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# numpy / pandas / pgmpy are imported inside the functions that use them,
+# so importing this module stays cheap until a model is actually built.
 
 DATA_GLOB = r"C:\\Users\\Flipp\\OneDrive\\Documents\\Desktop\\AICT-Assignment\\transport_node_train_202512\\transport_node_train_202512.*csv"  # <-- change to your folder
 STATIONS = {"CG2"} 
@@ -33,200 +38,345 @@ STATIONS = {"CG2"}
 LOW_Q = 0.3
 HIGH_Q = 0.8
 
+PEAK_HOURS = set(range(7, 10)) | set(range(17, 20))  # 7–9, 17–19
 
+# Typed, columnar copies of the CSVs are cached here (one per source file,
+# keyed by its path, size and mtime) and memory-mapped on later runs.
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ridership_cache")
 
+# Per-month sufficient statistics for incremental ingestion (RidershipStats)
+STATS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ridership_stats")
 
-# ----------------------------
-# 2) Load and concatenate all monthly CSVs
-# ----------------------------
-paths = sorted(glob.glob(DATA_GLOB))
-if not paths:
-    raise FileNotFoundError(f"No CSVs matched DATA_GLOB={DATA_GLOB!r}")
-
-dfs = []
-for p in paths:
-    df = pd.read_csv(p)
-
-    # Expected columns (DataMall):
-    # YEAR_MONTH, DAY_TYPE, TIME_PER_HOUR, PT_TYPE, PT_CODE,
-    # TOTAL_TAP_IN_VOLUME, TOTAL_TAP_OUT_VOLUME
-    required = {
-        "DAY_TYPE",
-        "PT_CODE",
-        "TOTAL_TAP_IN_VOLUME",
-        "TOTAL_TAP_OUT_VOLUME",
-    }
-    missing = required - set(df.columns)
-    if missing:
-        raise ValueError(f"{os.path.basename(p)} missing columns: {sorted(missing)}")
-
-    dfs.append(df)
-
-print(len(dfs), "files loaded.")
-
-data = pd.concat(dfs, ignore_index=True)
-
-# ----------------------------
-# 3) Clean + filter
-# ----------------------------
-# Standardize DAY_TYPE strings (defensive)
-data["DAY_TYPE"] = data["DAY_TYPE"].astype(str).str.strip().str.upper()
-data["PT_CODE"] = data["PT_CODE"].astype(str).str.strip().str.upper()
-
-# Filter stations if provided
-if STATIONS is not None:
-    stations_norm = {s.strip().upper() for s in STATIONS}
-    data = data[data["PT_CODE"].isin(stations_norm)].copy()
-    if data.empty:
-        raise ValueError(
-            f"No rows match STATIONS={stations_norm}. "
-            f"Check PT_CODE values in your CSV(s)."
-        )
-
-# Compute total hourly volume (proxy for demand intensity that hour)
-data["VOLUME"] = data["TOTAL_TAP_IN_VOLUME"].fillna(0) + data["TOTAL_TAP_OUT_VOLUME"].fillna(0)
-
-# Keep only the 2 known day types
-valid_day_types = {"WEEKDAY", "WEEKENDS/HOLIDAY"}
-data = data[data["DAY_TYPE"].isin(valid_day_types)].copy()
-if data.empty:
-    raise ValueError("After filtering DAY_TYPE, no rows remain. Check DAY_TYPE values.")
-
-# ----------------------------
-# 4) Discretise VOLUME into Demand states using global quantiles
-# ----------------------------
-# Compute thresholds on the chosen station(s) and across both day types.
-q_low = data["VOLUME"].quantile(LOW_Q)
-q_high = data["VOLUME"].quantile(HIGH_Q)
-
-
-def volume_to_demand(v: float) -> str:
-    if v <= q_low:
-        return "Low"
-    if v >= q_high:
-        return "High"
-    return "Moderate"
+# Rows per chunk for streaming ingestion (iter_ridership_chunks / from_stream)
+CHUNK_ROWS = 200_000
 
-data["DEMAND_STATE"] = data["VOLUME"].map(volume_to_demand)
 
 # ----------------------------
-# 5) Compute P(Demand_state | DAY_TYPE)
+# 1) Ridership loader (one typed pass + columnar cache)
 # ----------------------------
-# Count distribution of demand bins within each day type
-counts = (
-    data.groupby(["DAY_TYPE", "DEMAND_STATE"])
-        .size()
-        .unstack(fill_value=0)
-)
-
-# Ensure all states exist as columns
-for col in ["Low", "Moderate", "High"]:
-    if col not in counts.columns:
-        counts[col] = 0
-
-probs = counts.div(counts.sum(axis=1), axis=0)
-
-# Map into your BN naming convention:
-# - "Weekday" from WEEKDAY
-# - "Weekend" from WEEKENDS/HOLIDAY (dataset merges weekends + holidays)
-cal_daytype = {
-    "Weekday": [
-        float(probs.loc["WEEKDAY", "Low"]),
-        float(probs.loc["WEEKDAY", "Moderate"]),
-        float(probs.loc["WEEKDAY", "High"]),
-    ],
-    "Weekend": [
-        float(probs.loc["WEEKENDS/HOLIDAY", "Low"]),
-        float(probs.loc["WEEKENDS/HOLIDAY", "Moderate"]),
-        float(probs.loc["WEEKENDS/HOLIDAY", "High"]),
-    ],
+# Expected columns (DataMall):
+# YEAR_MONTH, DAY_TYPE, TIME_PER_HOUR, PT_TYPE, PT_CODE,
+# TOTAL_TAP_IN_VOLUME, TOTAL_TAP_OUT_VOLUME
+# Only the six used below are read, with explicit dtypes:
+# categorical strings, int8 hours and int32 volumes (~13 bytes per row).
+CATEGORY_COLUMNS = ["YEAR_MONTH", "DAY_TYPE", "PT_CODE"]
+INT_COLUMNS = {
+    "TIME_PER_HOUR": "int8",
+    "TOTAL_TAP_IN_VOLUME": "int32",
+    "TOTAL_TAP_OUT_VOLUME": "int32",
 }
+LOAD_COLUMNS = CATEGORY_COLUMNS + list(INT_COLUMNS)
 
 
-# ----------------------------
-# 6) Print results + diagnostics
-# ----------------------------
-print("Files loaded:", len(paths))
-print("Rows used:", len(data))
-print("Station filter:", STATIONS)
-print(f"Demand bin thresholds: q{int(LOW_Q*100)}={q_low:.2f}, q{int(HIGH_Q*100)}={q_high:.2f}")
-print("\nP(Demand | DAY_TYPE) based on hourly volumes:")
-print(probs[["Low", "Moderate", "High"]])
+def _normalize_categorical(col: pd.Series) -> pd.Series:
+    """strip().upper() on the categories only (not once per row)."""
+    import numpy as np
+    import pandas as pd
 
-print("\nCAL_DAYTYPE (use this in your model):")
-print(cal_daytype)
+    cats = col.cat.categories
+    norm = pd.Index([str(c).strip().upper() for c in cats])
+    uniq = pd.Index(norm.unique())
+    if len(uniq) == len(cats) and (norm == cats).all():
+        return col
+    # several raw spellings may collapse into one category
+    remap = np.append(uniq.get_indexer(norm), -1)
+    codes = remap[col.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, uniq), index=col.index, name=col.name)
 
-print("\nNOTE:")
-print("- 'Weekend' above corresponds to LTA DAY_TYPE='WEEKENDS/HOLIDAY'.")
-print("- You cannot compute CAL_HOLIDAY (Yes/No) from this dataset alone without a holiday calendar + daily-level linkage.")
 
-import glob
-import pandas as pd
+def _check_columns(path: str) -> None:
+    import pandas as pd
 
-# ----------------------------
-# CONFIG
-# ----------------------------
-DATA_GLOB = r"C:\\Users\\Flipp\\OneDrive\\Documents\\Desktop\\AICT-Assignment\\transport_node_train_202512\\transport_node_train_202512.*csv"  # <-- change to your folder
-STATIONS = {"CG2"}   # Change if needed
+    header = pd.read_csv(path, nrows=0).columns
+    missing = set(LOAD_COLUMNS) - set(header)
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} missing columns: {sorted(missing)}")
+
+
+def _read_csv_typed(path: str) -> pd.DataFrame:
+    import pandas as pd
+
+    _check_columns(path)
+    dtypes = {c: "category" for c in CATEGORY_COLUMNS}
+    try:
+        df = pd.read_csv(path, usecols=LOAD_COLUMNS, dtype={**dtypes, **INT_COLUMNS})
+    except ValueError:
+        # missing volumes: read as nullable, treat missing as 0
+        df = pd.read_csv(path, usecols=LOAD_COLUMNS, dtype={**dtypes, **{c: "Int32" for c in INT_COLUMNS}})
+        for c, dtype in INT_COLUMNS.items():
+            df[c] = df[c].fillna(0).astype(dtype)
+
+    for c in CATEGORY_COLUMNS:
+        df[c] = _normalize_categorical(df[c])
+    return df[LOAD_COLUMNS]
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{','.join(LOAD_COLUMNS)}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest}")
+
+
+def _write_cache(df: pd.DataFrame, target: str) -> None:
+    """One .npy per column (categoricals as codes) + categories in meta.json."""
+    import numpy as np
+
+    tmp = target + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    meta = {"rows": len(df), "categories": {}}
+    for c in CATEGORY_COLUMNS:
+        np.save(os.path.join(tmp, c + ".npy"), df[c].cat.codes.to_numpy())
+        meta["categories"][c] = [str(x) for x in df[c].cat.categories]
+    for c in INT_COLUMNS:
+        np.save(os.path.join(tmp, c + ".npy"), df[c].to_numpy())
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, target)
+
+
+def _read_cache(target: str) -> pd.DataFrame:
+    import numpy as np
+    import pandas as pd
+
+    with open(os.path.join(target, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    cols = {}
+    for c in CATEGORY_COLUMNS:
+        codes = np.load(os.path.join(target, c + ".npy"), mmap_mode="r")
+        cols[c] = pd.Categorical.from_codes(codes, meta["categories"][c])
+    for c in INT_COLUMNS:
+        cols[c] = np.load(os.path.join(target, c + ".npy"), mmap_mode="r")
+    # copy=False keeps the integer columns as views of the memory maps
+    # (the small int8 category codes are copied by pd.Categorical)
+    return pd.DataFrame(cols, copy=False)
+
+
+def load_ridership(paths, cache_dir: str | None = CACHE_DIR) -> pd.DataFrame:
+    """Load the monthly ridership CSVs once, typed, with a per-file columnar cache.
+
+    cache_dir=None disables the cache. A file whose size or mtime changed gets a
+    new cache entry; stale entries for it are removed. A single cached file
+    comes back with its hour / volume columns memory-mapped; several files
+    are concatenated (and so copied) into one frame.
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    frames = []
+    for p in paths:
+        df = None
+        if cache_dir is not None:
+            target = _cache_path(p, cache_dir)
+            if os.path.isdir(target):
+                try:
+                    df = _read_cache(target)
+                except (OSError, ValueError, KeyError):
+                    df = None
+        if df is None:
+            df = _read_csv_typed(p)
+            if cache_dir is not None:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    stem = os.path.basename(target).rsplit("-", 1)[0]
+                    for old in glob.glob(os.path.join(cache_dir, glob.escape(stem) + "-*")):
+                        if old != target:
+                            _remove_cache_entry(old)
+                    _write_cache(df, target)
+                except OSError:
+                    pass  # read-only location: just skip caching
+        frames.append(df)
+
+    if len(frames) == 1:
+        return frames[0]  # no concat: a cached file stays memory-mapped
+    data = pd.concat(frames, ignore_index=True)
+    # concat of categoricals with different categories falls back to object
+    for c in CATEGORY_COLUMNS:
+        data[c] = union_categoricals([f[c] for f in frames]) if frames else data[c]
+    return data
+
+
+def _remove_cache_entry(target: str) -> None:
+    for name in os.listdir(target):
+        os.remove(os.path.join(target, name))
+    os.rmdir(target)
+
+
+def iter_ridership_chunks(paths, chunk_rows: int = CHUNK_ROWS, stations=None, day_types=None):
+    """Typed ridership frames of at most chunk_rows rows, filtered as they are read.
+
+    Same columns and dtypes as load_ridership(), but only one chunk is ever
+    in memory: station / DAY_TYPE filters are applied to each chunk right
+    after parsing (on the categories, not per row), so nothing outside them
+    is kept. Chunks are not cached.
+    """
+    import numpy as np
+    import pandas as pd
 
-PEAK_HOURS = set(range(7, 10)) | set(range(17, 20))  # 7–9, 17–19
+    keep = {
+        "PT_CODE": None if stations is None else {s.strip().upper() for s in stations},
+        "DAY_TYPE": None if day_types is None else {d.strip().upper() for d in day_types},
+    }
+    dtypes = {**{c: "category" for c in CATEGORY_COLUMNS}, **{c: "Int32" for c in INT_COLUMNS}}
+    for path in paths:
+        _check_columns(path)
+        with pd.read_csv(path, usecols=LOAD_COLUMNS, dtype=dtypes, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                mask = None
+                for c in CATEGORY_COLUMNS:
+                    chunk[c] = _normalize_categorical(chunk[c])
+                    if keep.get(c) is not None:
+                        wanted = np.append(chunk[c].cat.categories.isin(keep[c]), False)
+                        hit = wanted[chunk[c].cat.codes.to_numpy()]
+                        mask = hit if mask is None else mask & hit
+                if mask is not None:
+                    if not mask.any():
+                        continue
+                    chunk = chunk[mask]
+                for c, dtype in INT_COLUMNS.items():
+                    chunk[c] = chunk[c].fillna(0).astype(dtype)
+                yield chunk[LOAD_COLUMNS].reset_index(drop=True)
 
 
 # ----------------------------
-# LOAD DATA
+# 2) Demand calibrations from the ridership data
 # ----------------------------
-dfs = [pd.read_csv(p) for p in glob.glob(DATA_GLOB)]
-data = pd.concat(dfs, ignore_index=True)
+# All derived columns come from one pass over plain numpy arrays (no
+# DataFrame copies, no per-row Python): VOLUME, a day-type code from the
+# DAY_TYPE categories, a peak flag from a 24-entry hour lookup, and the
+# Demand state from the quantile thresholds.
+DEMAND_STATES = ["Low", "Moderate", "High"]
+DAY_TYPES = {"WEEKDAY": "Weekday", "WEEKENDS/HOLIDAY": "Weekend"}  # LTA code -> BN state
+TIME_BUCKETS = ["Peak", "Off-Peak"]
 
-data["PT_CODE"] = data["PT_CODE"].str.upper()
-data["DAY_TYPE"] = data["DAY_TYPE"].str.upper()
+StationFeatures = namedtuple("StationFeatures", ["station", "volume", "daytype", "peak"])
 
-if STATIONS:
-    data = data[data["PT_CODE"].isin(STATIONS)]
 
-# Demand proxy
-data["VOLUME"] = data["TOTAL_TAP_IN_VOLUME"] + data["TOTAL_TAP_OUT_VOLUME"]
+def _peak_lookup():
+    """hour (0-23) -> 1 if it is a PEAK_HOURS hour else 0."""
+    import numpy as np
 
-# Time bucket
-def time_bucket(h):
-    return "Peak" if h in PEAK_HOURS else "Off-Peak"
+    lookup = np.zeros(24, dtype=np.int8)
+    lookup[sorted(PEAK_HOURS)] = 1
+    return lookup
 
-data["TIME_BUCKET"] = data["TIME_PER_HOUR"].apply(time_bucket)
-
-# ----------------------------
-# DEMAND DISCRETISATION
-# ----------------------------
-q30 = data["VOLUME"].quantile(LOW_Q)
-q70 = data["VOLUME"].quantile(HIGH_Q)
-
-def volume_to_demand(v):
-    if v <= q30:
-        return "Low"
-    if v >= q70:
-        return "High"
-    return "Moderate"
-
-data["DEMAND"] = data["VOLUME"].apply(volume_to_demand)
-
-# ----------------------------
-# CAL_TIME
-# ----------------------------
-counts = (
-    data.groupby(["TIME_BUCKET", "DEMAND"])
-        .size()
-        .unstack(fill_value=0)
-)
-
-probs = counts.div(counts.sum(axis=1), axis=0)
 
+def _daytype_codes(day_type):
+    """Categorical DAY_TYPE column -> index into DAY_TYPES (-1 for any other value)."""
+    import numpy as np
 
+    known = list(DAY_TYPES)
+    per_category = np.array([known.index(c) if c in known else -1 for c in day_type.cat.categories] + [-1], dtype=np.int8)
+    return per_category[day_type.cat.codes.to_numpy()]  # code -1 (missing) hits the trailing -1
 
 
+def demand_codes(volume, q_low, q_high):
+    """VOLUME -> index into DEMAND_STATES: Low if <= q_low, else High if >= q_high.
 
+    q_low / q_high may be scalars or per-row arrays (one threshold per station).
+    """
+    import numpy as np
+
+    return np.where(volume <= q_low, 0, np.where(volume >= q_high, 2, 1)).astype(np.int8)
+
+
+def station_features(ridership, stations):
+    """Derived columns for the chosen station(s) (all if stations is None)."""
+    import numpy as np
+
+    # (DAY_TYPE / PT_CODE are already stripped + upper-cased by the loader)
+    if stations is not None:
+        stations_norm = {s.strip().upper() for s in stations}
+        rows = np.flatnonzero(ridership["PT_CODE"].isin(stations_norm).to_numpy())
+        if len(rows) == 0:
+            raise ValueError(
+                f"No rows match STATIONS={stations_norm}. "
+                f"Check PT_CODE values in your CSV(s)."
+            )
+    else:
+        rows = slice(None)
+
+    # Total hourly volume (proxy for demand intensity that hour)
+    volume = (
+        ridership["TOTAL_TAP_IN_VOLUME"].to_numpy(np.int64)[rows]
+        + ridership["TOTAL_TAP_OUT_VOLUME"].to_numpy(np.int64)[rows]
+    )
+    return StationFeatures(
+        station=ridership["PT_CODE"].cat.codes.to_numpy()[rows],
+        volume=volume,
+        daytype=_daytype_codes(ridership["DAY_TYPE"])[rows],
+        peak=_peak_lookup()[ridership["TIME_PER_HOUR"].to_numpy()[rows]],
+    )
+
+
+def _count_table(groups, demand, n_groups):
+    """(n_groups, 3) counts of Demand state per group code."""
+    import numpy as np
+
+    return np.bincount(groups * 3 + demand, minlength=n_groups * 3).reshape(n_groups, 3)
+
+
+def calibrate_daytype(features):
+    """P(Demand_state | DAY_TYPE) -> (cal_daytype, probs, q_low, q_high, rows used)."""
+    import numpy as np
+    import pandas as pd
+
+    # Keep only the 2 known day types
+    valid = features.daytype >= 0
+    volume = features.volume[valid]
+    if len(volume) == 0:
+        raise ValueError("After filtering DAY_TYPE, no rows remain. Check DAY_TYPE values.")
+
+    # Discretise VOLUME into Demand states using global quantiles,
+    # computed on the chosen station(s) and across both day types.
+    q_low, q_high = np.quantile(volume, [LOW_Q, HIGH_Q])
+    counts = _count_table(features.daytype[valid], demand_codes(volume, q_low, q_high), len(DAY_TYPES))
+    for code, total in zip(DAY_TYPES, counts.sum(axis=1)):
+        if total == 0:
+            raise ValueError(f"No {code} rows for the chosen station(s).")
+
+    probs = pd.DataFrame(
+        counts / counts.sum(axis=1, keepdims=True),
+        index=pd.Index(list(DAY_TYPES), name="DAY_TYPE"),
+        columns=pd.Index(DEMAND_STATES, name="DEMAND_STATE"),
+    )
+
+    # Map into your BN naming convention:
+    # - "Weekday" from WEEKDAY
+    # - "Weekend" from WEEKENDS/HOLIDAY (dataset merges weekends + holidays)
+    cal_daytype = {state: probs.loc[code].tolist() for code, state in DAY_TYPES.items()}
+    return cal_daytype, probs, q_low, q_high, len(volume)
+
+
+def daytype_probs(cal_daytype: dict):
+    """CAL_DAYTYPE as the DAY_TYPE x DEMAND_STATE frame calibrate_daytype() returns."""
+    import pandas as pd
+
+    return pd.DataFrame(
+        [cal_daytype[state] for state in DAY_TYPES.values()],
+        index=pd.Index(list(DAY_TYPES), name="DAY_TYPE"),
+        columns=pd.Index(DEMAND_STATES, name="DEMAND_STATE"),
+    )
+
+
+def calibrate_time(features):
+    """P(Demand | Peak / Off-Peak) over the station rows (all day types)."""
+    import numpy as np
+
+    q_low, q_high = np.quantile(features.volume, [LOW_Q, HIGH_Q])
+    # bucket 0 = Peak, 1 = Off-Peak (TIME_BUCKETS order)
+    counts = _count_table(1 - features.peak, demand_codes(features.volume, q_low, q_high), len(TIME_BUCKETS))
+    for bucket, total in zip(TIME_BUCKETS, counts.sum(axis=1)):
+        if total == 0:
+            raise ValueError(f"No {bucket} rows for the chosen station(s).")
+
+    probs = counts / counts.sum(axis=1, keepdims=True)
+    return {bucket: row.tolist() for bucket, row in zip(TIME_BUCKETS, probs)}
 
 
 # ----------------------------
-# 1) State names
+# 3) State names
 # ----------------------------
 STATE = {
     "Season": ["Northeast Monsoon", "Southwest Monsoon", "Inter-monsoon"],
@@ -240,131 +390,23 @@ STATE = {
     "Crowding": ["Low", "Moderate", "High"],
 }
 
-
-# ----------------------------
-# 2) Define BN structure
-# ----------------------------
-model = DiscreteBayesianNetwork(
-    [
-        ("Season", "Weather"),
-        ("Weather", "Demand"),
-        ("Time", "Demand"),
-        ("DayType", "Demand"),
-        ("Holiday", "Demand"),
-        ("Mode", "Service"),
-        ("Demand", "Crowding"),
-        ("Service", "Crowding"),
-        ("Mode", "Crowding"),
-    ]
-)
-
-
-# ----------------------------
-# 3) Priors (roots) + Weather|Season
-# ----------------------------
-cpd_SEASON = TabularCPD(
-    variable="Season",
-    variable_card=3,
-    values=[
-        [0.25],  # Northeast Monsoon (Dec–early Mar)
-        [0.33],  # Southwest Monsoon (Jun–Sep)
-        [0.42],  # Inter-monsoon (Mar–May, Oct–Nov)
-    ],
-    state_names={"Season": STATE["Season"]},
-)
-
-# Example seasonal weather mix (keep or tune if you have better priors)
-cpd_WEATHER = TabularCPD(
-    variable="Weather",
-    variable_card=3,
-    values=[
-        # Clear
-        [0.35, 0.50, 0.40],  # NEM, SWM, IM
-        # Rainy
-        [0.45, 0.30, 0.25],
-        # Thunderstorms
-        [0.20, 0.20, 0.35],
-    ],
-    evidence=["Season"],
-    evidence_card=[3],
-    state_names={"Weather": STATE["Weather"], "Season": STATE["Season"]},
-)
-
-cpd_TIME = TabularCPD(
-    variable="Time",
-    variable_card=2,
-    values=[[0.16], [0.84]],  # Peak, Off-Peak 530am-1230am 
-    state_names={"Time": STATE["Time"]},
-)
-
-cpd_DAYTYPE = TabularCPD(
-    variable="DayType",
-    variable_card=2,
-    values=[[5 / 7], [2 / 7]],
-    state_names={"DayType": STATE["DayType"]},
-)
-
-# If you have the actual holiday rate for your study period, replace this.
-cpd_HOLIDAY = TabularCPD(
-    variable="Holiday",
-    variable_card=2,
-    values=[[11/365], [354/365]],  # Yes, No
-    state_names={"Holiday": STATE["Holiday"]},
-)
-
-cpd_MODE = TabularCPD(
-    variable="Mode",
-    variable_card=2,
-    values=[[0.50], [0.50]],
-    state_names={"Mode": STATE["Mode"]},
-)
-
-
-# ----------------------------
-# 4) CPT: Service | Mode  (document values)
-# ----------------------------
-# Columns correspond to Mode in order: Today, Future
-cpd_SERVICE = TabularCPD(
-    variable="Service",
-    variable_card=3,
-    values=[
-        # Normal
-        [0.9962, 0.991422],
-        # Reduced
-        [0.0037, 0.008578],
-        # Disrupted
-        [0.0001, 0.000000000001],
-    ],
-    evidence=["Mode"],
-    evidence_card=[2],
-    state_names={"Service": STATE["Service"], "Mode": STATE["Mode"]},
-)
+# BN structure
+EDGES = [
+    ("Season", "Weather"),
+    ("Weather", "Demand"),
+    ("Time", "Demand"),
+    ("DayType", "Demand"),
+    ("Holiday", "Demand"),
+    ("Mode", "Service"),
+    ("Demand", "Crowding"),
+    ("Service", "Crowding"),
+    ("Mode", "Crowding"),
+]
 
 
 # ----------------------------
-# 5) CPT: Demand | Weather, Time, DayType, Holiday
+# 4) Fixed calibration tables (not learned from the ridership data)
 # ----------------------------
-# Single-parent calibration tables from your write-ups:
-CAL_TIME = {
-    "Peak": [
-        probs.loc["Peak", "Low"],
-        probs.loc["Peak", "Moderate"],
-        probs.loc["Peak", "High"],
-    ],
-    "Off-Peak": [
-        probs.loc["Off-Peak", "Low"],
-        probs.loc["Off-Peak", "Moderate"],
-        probs.loc["Off-Peak", "High"],
-    ],
-}
-print("\nCAL_TIME (use this in your model):")
-print(CAL_TIME)
-
-CAL_DAYTYPE = {
-    "Weekday": cal_daytype["Weekday"],
-    "Weekend": cal_daytype["Weekend"],
-}
-
 #Source: LTA DataMall (Passenger Volume by Train Station).
 #How to use: Download the "Monthly Passenger Volume" dataset. Compare CG2 (Changi Airport) against Raffles Place or Jurong East. You will notice that while Raffles Place drops ~80% on weekends, Changi often stays within 70–85% of its weekday volume due to leisure traffic.
 
@@ -389,14 +431,15 @@ def _safe_normalize(p):
         return [1/3, 1/3, 1/3]
     return [x / s for x in p]
 
-def combine_calibrations(weather: str, time: str, daytype: str, holiday: str, alpha: float = 0.15):
+def combine_calibrations(weather: str, time: str, daytype: str, holiday: str,
+                         cal_time: dict, cal_daytype: dict, alpha: float = 0.15):
     """Log-linear (multiplicative) combination of single-parent calibrations.
 
     alpha is a small smoothing term to avoid zero-probabilities.
     """
     w = CAL_WEATHER[weather]
-    t = CAL_TIME[time]
-    d = CAL_DAYTYPE[daytype]
+    t = cal_time[time]
+    d = cal_daytype[daytype]
     h = CAL_HOLIDAY[holiday]
 
     # Multiply component-wise with a base prior, then normalize.
@@ -406,37 +449,8 @@ def combine_calibrations(weather: str, time: str, daytype: str, holiday: str, al
     ]
     return _safe_normalize(raw)
 
-# Build CPT columns in pgmpy evidence order: Weather, Time, DayType, Holiday
-cols = []
-for w in STATE["Weather"]:
-    for t in STATE["Time"]:
-        for d in STATE["DayType"]:
-            for h in STATE["Holiday"]:
-                cols.append(combine_calibrations(w, t, d, h))
-
-dem_low  = [c[0] for c in cols]
-dem_med  = [c[1] for c in cols]
-dem_high = [c[2] for c in cols]
-
-cpd_DEMAND = TabularCPD(
-    variable="Demand",
-    variable_card=3,
-    values=[dem_low, dem_med, dem_high],
-    evidence=["Weather", "Time", "DayType", "Holiday"],
-    evidence_card=[3, 2, 2, 2],
-    state_names={
-        "Demand": STATE["Demand"],
-        "Weather": STATE["Weather"],
-        "Time": STATE["Time"],
-        "DayType": STATE["DayType"],
-        "Holiday": STATE["Holiday"],
-    },
-)
 
-
-# ----------------------------
-# 6) CPT: Crowding | Demand, Service, Mode
-# ----------------------------
+# Crowding | Demand, Service, Mode
 # Evidence order here is: Demand, Service, Mode
 TODAY = {
     ("Low", "Normal"):      [0.90, 0.08, 0.02],
@@ -462,67 +476,907 @@ FUTURE = {
     ("High", "Disrupted"):  [0.01, 0.09, 0.90],
 }
 
-crowd_cols = []
-for dem in STATE["Demand"]:
-    for srv in STATE["Service"]:
-        for mode in STATE["Mode"]:
-            table = TODAY if mode == "Today" else FUTURE
-            crowd_cols.append(table[(dem, srv)])
-
-crowd_low  = [c[0] for c in crowd_cols]
-crowd_med  = [c[1] for c in crowd_cols]
-crowd_high = [c[2] for c in crowd_cols]
-
-cpd_CROWDING = TabularCPD(
-    variable="Crowding",
-    variable_card=3,
-    values=[crowd_low, crowd_med, crowd_high],
-    evidence=["Demand", "Service", "Mode"],
-    evidence_card=[3, 3, 2],
-    state_names={
-        "Crowding": STATE["Crowding"],
-        "Demand": STATE["Demand"],
-        "Service": STATE["Service"],
-        "Mode": STATE["Mode"],
-    },
-)
+
+# ----------------------------
+# 5) Build the network
+# ----------------------------
+def build_network(cal_time: dict, cal_daytype: dict):
+    """DiscreteBayesianNetwork with all CPDs added and validated."""
+    from pgmpy.models import DiscreteBayesianNetwork
+    from pgmpy.factors.discrete import TabularCPD
+
+    model = DiscreteBayesianNetwork(EDGES)
+
+    # Priors (roots) + Weather|Season
+    cpd_SEASON = TabularCPD(
+        variable="Season",
+        variable_card=3,
+        values=[
+            [0.25],  # Northeast Monsoon (Dec–early Mar)
+            [0.33],  # Southwest Monsoon (Jun–Sep)
+            [0.42],  # Inter-monsoon (Mar–May, Oct–Nov)
+        ],
+        state_names={"Season": STATE["Season"]},
+    )
+
+    # Example seasonal weather mix (keep or tune if you have better priors)
+    cpd_WEATHER = TabularCPD(
+        variable="Weather",
+        variable_card=3,
+        values=[
+            # Clear
+            [0.35, 0.50, 0.40],  # NEM, SWM, IM
+            # Rainy
+            [0.45, 0.30, 0.25],
+            # Thunderstorms
+            [0.20, 0.20, 0.35],
+        ],
+        evidence=["Season"],
+        evidence_card=[3],
+        state_names={"Weather": STATE["Weather"], "Season": STATE["Season"]},
+    )
+
+    cpd_TIME = TabularCPD(
+        variable="Time",
+        variable_card=2,
+        values=[[0.16], [0.84]],  # Peak, Off-Peak 530am-1230am 
+        state_names={"Time": STATE["Time"]},
+    )
+
+    cpd_DAYTYPE = TabularCPD(
+        variable="DayType",
+        variable_card=2,
+        values=[[5 / 7], [2 / 7]],
+        state_names={"DayType": STATE["DayType"]},
+    )
+
+    # If you have the actual holiday rate for your study period, replace this.
+    cpd_HOLIDAY = TabularCPD(
+        variable="Holiday",
+        variable_card=2,
+        values=[[11/365], [354/365]],  # Yes, No
+        state_names={"Holiday": STATE["Holiday"]},
+    )
+
+    cpd_MODE = TabularCPD(
+        variable="Mode",
+        variable_card=2,
+        values=[[0.50], [0.50]],
+        state_names={"Mode": STATE["Mode"]},
+    )
+
+    # CPT: Service | Mode  (document values)
+    # Columns correspond to Mode in order: Today, Future
+    cpd_SERVICE = TabularCPD(
+        variable="Service",
+        variable_card=3,
+        values=[
+            # Normal
+            [0.9962, 0.991422],
+            # Reduced
+            [0.0037, 0.008578],
+            # Disrupted
+            [0.0001, 0.000000000001],
+        ],
+        evidence=["Mode"],
+        evidence_card=[2],
+        state_names={"Service": STATE["Service"], "Mode": STATE["Mode"]},
+    )
+
+    # CPT: Demand | Weather, Time, DayType, Holiday
+    # Build CPT columns in pgmpy evidence order: Weather, Time, DayType, Holiday
+    cols = []
+    for w in STATE["Weather"]:
+        for t in STATE["Time"]:
+            for d in STATE["DayType"]:
+                for h in STATE["Holiday"]:
+                    cols.append(combine_calibrations(w, t, d, h, cal_time, cal_daytype))
+
+    dem_low  = [c[0] for c in cols]
+    dem_med  = [c[1] for c in cols]
+    dem_high = [c[2] for c in cols]
+
+    cpd_DEMAND = TabularCPD(
+        variable="Demand",
+        variable_card=3,
+        values=[dem_low, dem_med, dem_high],
+        evidence=["Weather", "Time", "DayType", "Holiday"],
+        evidence_card=[3, 2, 2, 2],
+        state_names={
+            "Demand": STATE["Demand"],
+            "Weather": STATE["Weather"],
+            "Time": STATE["Time"],
+            "DayType": STATE["DayType"],
+            "Holiday": STATE["Holiday"],
+        },
+    )
+
+    # CPT: Crowding | Demand, Service, Mode (Future mode has a crowding "buffer")
+    crowd_cols = []
+    for dem in STATE["Demand"]:
+        for srv in STATE["Service"]:
+            for mode in STATE["Mode"]:
+                table = TODAY if mode == "Today" else FUTURE
+                crowd_cols.append(table[(dem, srv)])
+
+    crowd_low  = [c[0] for c in crowd_cols]
+    crowd_med  = [c[1] for c in crowd_cols]
+    crowd_high = [c[2] for c in crowd_cols]
+
+    cpd_CROWDING = TabularCPD(
+        variable="Crowding",
+        variable_card=3,
+        values=[crowd_low, crowd_med, crowd_high],
+        evidence=["Demand", "Service", "Mode"],
+        evidence_card=[3, 3, 2],
+        state_names={
+            "Crowding": STATE["Crowding"],
+            "Demand": STATE["Demand"],
+            "Service": STATE["Service"],
+            "Mode": STATE["Mode"],
+        },
+    )
+
+    # Add CPDs + validate
+    model.add_cpds(
+        cpd_SEASON,
+        cpd_WEATHER,
+        cpd_TIME,
+        cpd_DAYTYPE,
+        cpd_HOLIDAY,
+        cpd_MODE,
+        cpd_SERVICE,
+        cpd_DEMAND,
+        cpd_CROWDING,
+    )
+
+    assert model.check_model(), "Model is invalid. Check CPT dimensions / sums."
+    return model
+
+
+# ----------------------------
+# 6) Compiled crowding table: P(Crowding | evidence) by array indexing
+# ----------------------------
+# Evidence variables covered by the table, in axis order.
+# Forecast-frame columns understood besides TABLE_VARIABLES
+HOUR_COLUMN = "TIME_PER_HOUR"   # hour 0-23 -> Time (Peak / Off-Peak)
+STATION_COLUMN = "PT_CODE"      # routes rows to per-station models (StationRegistry)
+
+TABLE_VARIABLES = ["Weather", "Time", "DayType", "Holiday", "Mode", "Service"]
+
+
+def _cpd_array(network, variable: str, order: list):
+    """CPD values of `variable` as an array with axes in `order`."""
+    import numpy as np
+
+    cpd = network.get_cpds(variable)
+    return np.transpose(cpd.values, [cpd.variables.index(v) for v in order])
+
+
+class CrowdingTable:
+    """Dense P(Crowding | evidence) for every full and partial evidence over
+    TABLE_VARIABLES.
+
+    probs has one axis per evidence variable of length card + 1: codes
+    0..card-1 are its states (in STATE order) and code `card` means
+    "not observed" (marginalised out). The last axis is Crowding.
+    """
+
+    def __init__(self, network):
+        import numpy as np
+
+        # P(Weather) = sum_Season P(Season) P(Weather | Season)
+        p_weather = np.einsum("s,ws->w",
+                              _cpd_array(network, "Season", ["Season"]),
+                              _cpd_array(network, "Weather", ["Weather", "Season"]))
+        p_time = _cpd_array(network, "Time", ["Time"])
+        p_daytype = _cpd_array(network, "DayType", ["DayType"])
+        p_holiday = _cpd_array(network, "Holiday", ["Holiday"])
+        p_mode = _cpd_array(network, "Mode", ["Mode"])
+        p_service = _cpd_array(network, "Service", ["Service", "Mode"])
+        p_demand = _cpd_array(network, "Demand", ["Demand", "Weather", "Time", "DayType", "Holiday"])
+        p_crowding = _cpd_array(network, "Crowding", ["Crowding", "Demand", "Service", "Mode"])
+
+        # Joint P(W, T, D, H, M, S, Crowding), Demand summed out
+        joint = np.einsum(
+            "w,t,d,h,m,sm,ewtdh,cesm->wtdhmsc",
+            p_weather, p_time, p_daytype, p_holiday, p_mode,
+            p_service, p_demand, p_crowding,
+        )
+
+        # Append the marginal over each evidence axis as its "not observed" code
+        for axis in range(len(TABLE_VARIABLES)):
+            joint = np.concatenate([joint, joint.sum(axis=axis, keepdims=True)], axis=axis)
+
+        self.probs = joint / joint.sum(axis=-1, keepdims=True)
+        self.states = {v: list(network.get_cpds(v).state_names[v]) for v in TABLE_VARIABLES}
+        self.crowding_states = list(network.get_cpds("Crowding").state_names["Crowding"])
+        self.codes = {v: {s: i for i, s in enumerate(states)} for v, states in self.states.items()}
+
+    def covers(self, evidence: dict) -> bool:
+        return all(v in self.codes for v in evidence)
+
+    def index(self, evidence: dict) -> tuple:
+        """Evidence dict -> index tuple into probs (KeyError on unknown names)."""
+        return tuple(
+            self.codes[v][evidence[v]] if v in evidence else len(self.states[v])
+            for v in TABLE_VARIABLES
+        )
+
+    def lookup(self, evidence: dict):
+        """P(Crowding | evidence) as an array in crowding_states order."""
+        for v in evidence:
+            if v not in self.codes:
+                raise KeyError(f"{v!r} is not a table variable: {TABLE_VARIABLES}")
+        return self.probs[self.index(evidence)]
+
+    def codes_for(self, variable: str, values, n: int):
+        """Column of labels or int codes -> int codes; missing / NaN / negative
+        means not observed."""
+        import numpy as np
+        import pandas as pd
+
+        card = len(self.states[variable])
+        if values is None:
+            return np.full(n, card, dtype=np.intp)
+
+        values = pd.Series(values) if not isinstance(values, pd.Series) else values
+        if pd.api.types.is_integer_dtype(values.dtype):
+            codes = values.to_numpy(dtype=np.intp, copy=True)
+            if (codes >= card).any():
+                raise ValueError(f"{variable} codes must be < {card}")
+            codes[codes < 0] = card
+            return codes
+
+        cat = pd.Categorical(values, categories=self.states[variable])
+        codes = cat.codes.astype(np.intp)
+        unknown = (codes < 0) & values.notna().to_numpy()
+        if unknown.any():
+            bad = sorted(set(values[unknown].astype(str)))[:5]
+            raise ValueError(f"Unknown {variable} states {bad}; expected {self.states[variable]}")
+        codes[codes < 0] = card
+        return codes
+
+    def hour_codes(self, hours):
+        """TIME_PER_HOUR column (0-23) -> Time codes via _peak_lookup();
+        missing hours -> -1 (not observed)."""
+        import numpy as np
+        import pandas as pd
+
+        hours = pd.Series(hours)
+        missing = hours.isna().to_numpy()
+        h = hours.fillna(0).to_numpy(dtype=np.intp)
+        if ((h < 0) | (h > 23)).any():
+            raise ValueError(f"{HOUR_COLUMN} must be in 0..23")
+        time = self.codes["Time"]
+        codes = np.where(_peak_lookup()[h] == 1, time["Peak"], time["Off-Peak"]).astype(np.intp)
+        codes[missing] = -1
+        return codes
+
+    def lookup_batch(self, evidence):
+        """P(Crowding | row evidence) for every row -> (N, 3) array.
+
+        evidence is a DataFrame or a dict of equal-length columns named after
+        TABLE_VARIABLES, holding state labels or int codes (missing columns /
+        NaN / negative codes = not observed). An hour column (TIME_PER_HOUR)
+        may stand in for Time; a Crowding column (e.g. labels) is ignored.
+        Any other column raises KeyError rather than being dropped - use
+        StationRegistry.crowding_batch for frames with a PT_CODE column.
+        Each row is one gather from the compiled table, so the cost is a
+        few array passes over N.
+        """
+        import numpy as np
+
+        columns = dict(evidence.items()) if hasattr(evidence, "items") else dict(evidence)
+        if HOUR_COLUMN in columns:
+            if "Time" in columns:
+                raise ValueError(f"Give either Time or {HOUR_COLUMN}, not both")
+            columns["Time"] = self.hour_codes(columns.pop(HOUR_COLUMN))
+        other = [c for c in columns if c not in self.codes and c != "Crowding"]
+        if STATION_COLUMN in other:
+            raise KeyError(f"{STATION_COLUMN} rows need per-station models; use StationRegistry.crowding_batch")
+        if any(c in STATE for c in other):
+            raise KeyError(f"{other} cannot be batched; use CrowdingModel.crowding() per row")
+        if other:
+            raise KeyError(f"Unrecognised evidence columns {other}; expected {TABLE_VARIABLES} or {HOUR_COLUMN}")
+        lengths = {len(columns[v]) for v in TABLE_VARIABLES if v in columns}
+        if len(lengths) > 1:
+            raise ValueError("evidence columns must have equal length")
+        n = lengths.pop() if lengths else 0
+
+        codes = [self.codes_for(v, columns.get(v), n) for v in TABLE_VARIABLES]
+        flat = np.ravel_multi_index(codes, self.probs.shape[:-1])
+        return self.probs.reshape(-1, self.probs.shape[-1])[flat]
+
+
+# ----------------------------
+# 7) CrowdingModel: built on demand, memoized
+# ----------------------------
+_MODELS = {}
+
+
+def _resolve_paths(paths) -> list:
+    """paths, or the files matching DATA_GLOB when paths is None."""
+    if paths is None:
+        paths = sorted(glob.glob(DATA_GLOB))
+        if not paths:
+            raise FileNotFoundError(f"No CSVs matched DATA_GLOB={DATA_GLOB!r}")
+    return list(paths)
+
+
+def _data_key(paths, stations):
+    """Memo key: the files (path, size, mtime) and the station filter."""
+    return (
+        tuple((os.path.abspath(p), os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in paths),
+        None if stations is None else frozenset(s.strip().upper() for s in stations),
+    )
+
+
+class CrowdingModel:
+    """Calibrated crowding BN.
+
+    Nothing is loaded or built at import time: CrowdingModel.from_data()
+    reads the data, calibrates and builds the network on first use and
+    returns the same instance for the same inputs afterwards.
+    """
+
+    def __init__(self, network, cal_time: dict, cal_daytype: dict, diagnostics: dict | None = None):
+        self.network = network
+        self.cal_time = cal_time
+        self.cal_daytype = cal_daytype
+        self.diagnostics = diagnostics or {}
+        self._infer = None
+        self._table = None
+        self._junction_tree = None
+
+    @classmethod
+    def from_data(cls, paths=None, stations=STATIONS, cache_dir: str | None = CACHE_DIR, verbose: bool = False):
+        """Build (or reuse) the model for these CSVs and station filter.
+
+        paths=None uses DATA_GLOB. The memo is keyed by the files (path,
+        size, mtime) and stations, so changed data is picked up.
+        """
+        paths = _resolve_paths(paths)
+        key = _data_key(paths, stations)
+        model = _MODELS.get(key)
+        if model is None:
+            model = cls._build(paths, stations, cache_dir)
+            _MODELS[key] = model
+        if verbose:
+            model.print_diagnostics()
+        return model
+
+    @classmethod
+    def _build(cls, paths, stations, cache_dir):
+        ridership = load_ridership(paths, cache_dir)
+        features = station_features(ridership, stations)
+        cal_daytype, probs, q_low, q_high, rows = calibrate_daytype(features)
+        cal_time = calibrate_time(features)
+
+        diagnostics = {
+            "files": len(paths),
+            "rows": rows,
+            "stations": stations,
+            "q_low": q_low,
+            "q_high": q_high,
+            "daytype_probs": probs,
+        }
+        return cls(build_network(cal_time, cal_daytype), cal_time, cal_daytype, diagnostics)
+
+    @classmethod
+    def from_stream(cls, paths=None, stations=STATIONS, chunk_rows: int = CHUNK_ROWS, verbose: bool = False):
+        """from_data() in bounded memory, for data that does not fit at once.
+
+        The CSVs are read chunk by chunk (station filter applied per chunk)
+        into an in-memory RidershipStats, so peak memory is one chunk plus
+        the sketches. The calibrations equal from_data()'s while every
+        sketch is still exact (see quantile_sketch); once cells compact
+        (e.g. stations=None pools every station) the thresholds and counts
+        are sketch approximations. Not memoized.
+        """
+        paths = _resolve_paths(paths)
+        stats = RidershipStats(root=None)
+        stats.ingest_stream(paths, stations, chunk_rows)
+        found = stats.stations()
+        if not found:
+            raise ValueError(
+                f"No rows match STATIONS={stations}. "
+                f"Check PT_CODE values in your CSV(s)."
+            )
+        cal = stats.calibrations(found)
+
+        diagnostics = {
+            "files": len(paths),
+            "rows": cal["rows"],
+            "stations": stations,
+            "q_low": cal["q_low"],
+            "q_high": cal["q_high"],
+            "daytype_probs": daytype_probs(cal["cal_daytype"]),
+        }
+        model = cls(build_network(cal["cal_time"], cal["cal_daytype"]), cal["cal_time"], cal["cal_daytype"], diagnostics)
+        if verbose:
+            model.print_diagnostics()
+        return model
+
+    @property
+    def infer(self):
+        if self._infer is None:
+            from pgmpy.inference import VariableElimination
+            self._infer = VariableElimination(self.network)
+        return self._infer
+
+    @property
+    def table(self) -> CrowdingTable:
+        if self._table is None:
+            self._table = CrowdingTable(self.network)
+        return self._table
+
+    @property
+    def junction_tree(self):
+        if self._junction_tree is None:
+            from junction_tree import JunctionTree
+            self._junction_tree = JunctionTree(self.network)
+        return self._junction_tree
+
+    def query(self, evidence: dict):
+        """P(Crowding | evidence) as a pgmpy DiscreteFactor (variable elimination)."""
+        return self.infer.query(variables=["Crowding"], evidence=evidence, show_progress=False)
+
+    def crowding(self, evidence: dict):
+        """P(Crowding | evidence) as an array in STATE["Crowding"] order.
+
+        Evidence over TABLE_VARIABLES is a CrowdingTable lookup; anything
+        else (e.g. Season or Demand) goes through the junction tree, whose
+        cached messages make repeated what-if queries cheap.
+        """
+        if self.table.covers(evidence):
+            return self.table.lookup(evidence)
+        probs = self.junction_tree.query("Crowding", evidence)
+        order = [self.junction_tree.states["Crowding"].index(s) for s in STATE["Crowding"]]
+        return probs[order]
+
+    def crowding_batch(self, evidence):
+        """P(Crowding) for every row of an evidence DataFrame / dict of
+        arrays -> (N, 3) array (see CrowdingTable.lookup_batch)."""
+        return self.table.lookup_batch(evidence)
+
+    def print_diagnostics(self):
+        d = self.diagnostics
+        if d.get("files") is not None:  # None: built from a RidershipStats store
+            print(d["files"], "files loaded.")
+            print("Files loaded:", d["files"])
+        print("Rows used:", d["rows"])
+        print("Station filter:", d["stations"])
+        print(f"Demand bin thresholds: q{int(LOW_Q*100)}={d['q_low']:.2f}, q{int(HIGH_Q*100)}={d['q_high']:.2f}")
+        print("\nP(Demand | DAY_TYPE) based on hourly volumes:")
+        print(d["daytype_probs"][["Low", "Moderate", "High"]])
+
+        print("\nCAL_DAYTYPE (use this in your model):")
+        print(self.cal_daytype)
+
+        print("\nNOTE:")
+        print("- 'Weekend' above corresponds to LTA DAY_TYPE='WEEKENDS/HOLIDAY'.")
+        print("- You cannot compute CAL_HOLIDAY (Yes/No) from this dataset alone without a holiday calendar + daily-level linkage.")
+
+        print("\nCAL_TIME (use this in your model):")
+        print(self.cal_time)
+
+
+def __getattr__(name):
+    # Old module-level names, now built lazily on first access.
+    if name == "model":
+        return CrowdingModel.from_data().network
+    if name == "infer":
+        return CrowdingModel.from_data().infer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ----------------------------
-# 7) Add CPDs + validate
+# 8) Per-station calibration + model registry
 # ----------------------------
-model.add_cpds(
-    cpd_SEASON,
-    cpd_WEATHER,
-    cpd_TIME,
-    cpd_DAYTYPE,
-    cpd_HOLIDAY,
-    cpd_MODE,
-    cpd_SERVICE,
-    cpd_DEMAND,
-    cpd_CROWDING,
-)
+def fit_station_calibrations(ridership) -> dict:
+    """Demand thresholds, CAL_DAYTYPE and CAL_TIME for every PT_CODE at once.
 
-assert model.check_model(), "Model is invalid. Check CPT dimensions / sums."
+    Same definitions as calibrate_daytype() / calibrate_time() for a single
+    station, computed with one groupby-quantile and one count table per CPT
+    instead of a loop over stations. A station with no rows for a day type
+    or time bucket gets a uniform row (as _safe_normalize does).
+    """
+    import numpy as np
+    import pandas as pd
+
+    f = station_features(ridership, None)
+    stations = list(ridership["PT_CODE"].cat.categories)
+    n = len(stations)
+    valid = f.daytype >= 0
+
+    def thresholds(mask):
+        # per-station quantiles -> (n, 2) table and per-row (low, high) arrays
+        q = (
+            pd.Series(f.volume[mask]).groupby(f.station[mask])
+            .quantile([LOW_Q, HIGH_Q])
+            .unstack()
+            .reindex(range(n))
+            .to_numpy()
+        )
+        return q, q[f.station, 0], q[f.station, 1]
+
+    def normalize(counts):
+        totals = counts.sum(axis=-1, keepdims=True)
+        return np.divide(counts, totals, out=np.full(counts.shape, 1 / 3), where=totals > 0)
+
+    # CAL_DAYTYPE: thresholds over the two known day types
+    q_day, low, high = thresholds(valid)
+    demand = demand_codes(f.volume[valid], low[valid], high[valid])
+    daytype = normalize(_count_table(f.station[valid] * 2 + f.daytype[valid], demand, n * 2).reshape(n, 2, 3))
+
+    # CAL_TIME: thresholds over all of the station's rows
+    _, low, high = thresholds(slice(None))
+    demand = demand_codes(f.volume, low, high)
+    time = normalize(_count_table(f.station * 2 + (1 - f.peak), demand, n * 2).reshape(n, 2, 3))
+
+    rows = np.bincount(f.station[valid], minlength=n)
+    present = np.bincount(f.station, minlength=n) > 0
+    calibrations = {}
+    for s in np.flatnonzero(present):
+        calibrations[stations[s]] = {
+            "cal_daytype": {state: daytype[s, i].tolist() for i, state in enumerate(DAY_TYPES.values())},
+            "cal_time": {bucket: time[s, i].tolist() for i, bucket in enumerate(TIME_BUCKETS)},
+            "q_low": float(q_day[s, 0]),
+            "q_high": float(q_day[s, 1]),
+            "rows": int(rows[s]),
+        }
+    return calibrations
+
+def _build_station_network(item):
+    # process pool worker: (station, calibration) -> (station, network)
+    station, cal = item
+    return station, build_network(cal["cal_time"], cal["cal_daytype"])
+
+
+class StationRegistry:
+    """PT_CODE -> CrowdingModel, fitted for every station in one pass.
+
+    Calibrations for all stations are computed up front (cheap, vectorized);
+    each station's network is only built when it is first requested, or for
+    all stations at once with build_all(workers=...).
+    """
+
+    def __init__(self, calibrations: dict, files: int | None = None):
+        self.calibrations = calibrations
+        self.files = files  # CSVs fitted from (None for a statistics store)
+        self._models = {}
+
+    @classmethod
+    def from_stats(cls, stats: "RidershipStats"):
+        """Registry from an incremental statistics store (no CSVs read)."""
+        return cls(stats.calibrations_all())
+
+    @classmethod
+    def fit(cls, paths=None, cache_dir: str | None = CACHE_DIR):
+        """Fit (or reuse) the registry for these CSVs; memoized like from_data()."""
+        paths = _resolve_paths(paths)
+        key = _data_key(paths, None)
+        registry = _REGISTRIES.get(key)
+        if registry is None:
+            registry = cls(fit_station_calibrations(load_ridership(paths, cache_dir)), files=len(paths))
+            _REGISTRIES[key] = registry
+        return registry
+
+    def stations(self) -> list:
+        return sorted(self.calibrations)
+
+    def __contains__(self, station) -> bool:
+        return station.strip().upper() in self.calibrations
+
+    def __len__(self) -> int:
+        return len(self.calibrations)
+
+    def __getitem__(self, station) -> CrowdingModel:
+        station = station.strip().upper()
+        model = self._models.get(station)
+        if model is None:
+            cal = self.calibrations[station]  # KeyError for an unknown PT_CODE
+            _, network = _build_station_network((station, cal))
+            model = self._models[station] = self._model(station, network)
+        return model
+
+    def crowding_batch(self, evidence):
+        """P(Crowding) for every row of a multi-station evidence frame -> (N, 3).
+
+        Rows are grouped by their STATION_COLUMN value and each group is
+        looked up in that station's model (CrowdingTable.lookup_batch on the
+        remaining columns). Unknown stations raise KeyError.
+        """
+        import numpy as np
+        import pandas as pd
+
+        columns = dict(evidence.items()) if hasattr(evidence, "items") else dict(evidence)
+        if STATION_COLUMN not in columns:
+            raise KeyError(f"evidence needs a {STATION_COLUMN} column")
+        codes, names = pd.factorize(pd.Series(columns.pop(STATION_COLUMN)).astype(str).str.strip().str.upper())
+        if (codes < 0).any():
+            raise ValueError(f"missing {STATION_COLUMN} values")
+        columns = {c: pd.Series(v).reset_index(drop=True) for c, v in columns.items()}
+
+        out = np.empty((len(codes), len(STATE["Crowding"])))
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1]]) if len(order) else []
+        for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+            rows = order[start:stop]
+            station = names[codes[rows[0]]]
+            out[rows] = self[station].crowding_batch({c: v.iloc[rows] for c, v in columns.items()})
+        return out
+
+    def build_all(self, workers: int | None = None) -> None:
+        """Build every station's network now, optionally in a process pool."""
+        todo = [(s, cal) for s, cal in self.calibrations.items() if s not in self._models]
+        if workers is not None and workers > 1 and len(todo) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                built = list(pool.map(_build_station_network, todo, chunksize=max(1, len(todo) // (workers * 4))))
+        else:
+            built = [_build_station_network(item) for item in todo]
+        for station, network in built:
+            self._models[station] = self._model(station, network)
+
+    def _model(self, station, network) -> CrowdingModel:
+        cal = self.calibrations[station]
+        diagnostics = {
+            "files": self.files,
+            "rows": cal["rows"],
+            "stations": {station},
+            "q_low": cal["q_low"],
+            "q_high": cal["q_high"],
+            "daytype_probs": daytype_probs(cal["cal_daytype"]),
+        }
+        return CrowdingModel(network, cal["cal_time"], cal["cal_daytype"], diagnostics)
+
+
+_REGISTRIES = {}
 
 
 # ----------------------------
-# 8) Inference helper + sample scenarios
+# 9) Incremental statistics store (one file per ingested month)
 # ----------------------------
-infer = VariableElimination(model)
+# Everything the calibrations need is a function of each station's VOLUME
+# distribution within six cells (day type WEEKDAY / WEEKENDS/HOLIDAY / other
+# x Peak / Off-Peak). A month is ingested once into a quantile sketch per
+# (station, cell); thresholds and Low/Moderate/High counts are then read off
+# the merged sketches, so a new month never reloads the history.
+def _cell_codes(features):
+    """(day type slot, peak) -> cell 0..5; cell = 2 * slot + peak, 'other' day types in slot 2."""
+    import numpy as np
+
+    slot = np.where(features.daytype >= 0, features.daytype, len(DAY_TYPES))
+    return slot * 2 + features.peak
+
+
+N_CELLS = (len(DAY_TYPES) + 1) * 2
+PEAK_CELLS = list(range(1, N_CELLS, 2))
+DAYTYPE_CELLS = [[2 * d, 2 * d + 1] for d in range(len(DAY_TYPES))]
+
+
+def _demand_counts(sketch, q_low, q_high):
+    """[Low, Moderate, High] counts in a sketch under demand_codes() rules."""
+    low = sketch.rank(q_low, inclusive=True)
+    high = sketch.n - (sketch.rank(q_high, inclusive=False) if q_high > q_low else low)
+    return [low, sketch.n - low - high, high]
+
 
-def run_scenario(name: str, evidence: dict):
-    dist = infer.query(variables=["Crowding"], evidence=evidence, show_progress=False)
-    # pgmpy returns a DiscreteFactor for single-variable queries
-    factor = dist
+class RidershipStats:
+    """Append-only per-station, per-month sufficient statistics.
+
+    root/<YEAR_MONTH>.json holds, for every station, one QuantileSketch of
+    VOLUME per cell. ingest() writes (or replaces) month files and folds them
+    into the merged sketches kept in memory; calibrations() derives the same
+    dicts as fit_station_calibrations() from those sketches alone.
+    root=None keeps everything in memory (nothing is written).
+    """
+
+    def __init__(self, root: str | None = STATS_DIR, k: int | None = None):
+        from quantile_sketch import DEFAULT_K
+
+        self.root = root
+        self.k = k or DEFAULT_K
+        self._memory = {}    # month -> stats, when root is None
+        self._merged = None  # station -> [QuantileSketch per cell]
+
+    def months(self) -> list:
+        if self.root is None:
+            return sorted(self._memory)
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.root) if name.endswith(".json"))
+
+    def _month_path(self, month: str) -> str:
+        return os.path.join(self.root, f"{month}.json")
+
+    def ingest(self, ridership, month: str | None = None) -> list:
+        """Add the months in a ridership frame; returns the months written.
+
+        month=None splits by the YEAR_MONTH column. Re-ingesting a month
+        replaces its statistics.
+        """
+        pending = self._sketch_frame(ridership, month)
+        for label, stats in pending.items():
+            self.add_month(label, stats)
+        return list(pending)
+
+    def ingest_stream(self, paths, stations=None, chunk_rows: int = CHUNK_ROWS) -> list:
+        """ingest() for CSVs too large to load: read in chunks, keep only sketches.
+
+        Peak memory is one chunk plus the sketches (bounded per station and
+        cell), whatever the number of rows. Months are written once every
+        chunk has been folded in, so a month split across files is whole.
+        """
+        pending = {}
+        for chunk in iter_ridership_chunks(paths, chunk_rows, stations=stations):
+            for label, stats in self._sketch_frame(chunk).items():
+                month = pending.setdefault(label, {})
+                for station, cells in stats.items():
+                    merged = month.setdefault(station, {})
+                    for cell, sketch in cells.items():
+                        if cell in merged:
+                            merged[cell].merge(sketch)
+                        else:
+                            merged[cell] = sketch
+        for label, stats in pending.items():
+            self.add_month(label, stats)
+        return list(pending)
+
+    def _sketch_frame(self, ridership, month: str | None = None) -> dict:
+        """month -> station -> {cell: QuantileSketch} for a ridership frame."""
+        import numpy as np
+
+        features = station_features(ridership, None)
+        cells = _cell_codes(features)
+        if month is None:
+            month_codes = ridership["YEAR_MONTH"].cat.codes.to_numpy()
+            months = list(ridership["YEAR_MONTH"].cat.categories)
+        else:
+            month_codes = np.zeros(len(features.volume), dtype=np.int8)
+            months = [month]
+
+        out = {}
+        for m, label in enumerate(months):
+            rows = np.flatnonzero(month_codes == m)
+            if len(rows):
+                out[label] = self._sketch_month(features, cells, rows, ridership["PT_CODE"].cat.categories)
+        return out
+
+    def _sketch_month(self, features, cells, rows, station_names) -> dict:
+        """station -> {cell: QuantileSketch} for the given rows (one sort, no per-row Python)."""
+        import numpy as np
+        from quantile_sketch import QuantileSketch
+
+        key = features.station[rows].astype(np.int64) * N_CELLS + cells[rows]
+        order = np.argsort(key, kind="stable")
+        key, volume = key[order], features.volume[rows][order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        stats = {}
+        for start, stop in zip(starts, np.r_[starts[1:], len(key)]):
+            station, cell = divmod(int(key[start]), N_CELLS)
+            stats.setdefault(station_names[station], {})[cell] = QuantileSketch(self.k, volume[start:stop])
+        return stats
+
+    def add_month(self, month: str, stats: dict) -> None:
+        """Persist one month's {station: {cell: sketch}} and fold it into the merged view."""
+        if self.root is None:
+            replaced = month in self._memory
+            self._memory[month] = stats
+        else:
+            replaced = os.path.exists(self._month_path(month))
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self._month_path(month) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {station: {str(c): s.to_dict() for c, s in cells.items()} for station, cells in stats.items()},
+                    f,
+                )
+            os.replace(tmp, self._month_path(month))
+
+        if replaced:
+            self._merged = None  # old month's counts are baked in: rebuild on next use
+        elif self._merged is not None:
+            self._fold(stats)
+
+    def _fold(self, stats: dict) -> None:
+        from quantile_sketch import QuantileSketch
+
+        for station, cells in stats.items():
+            merged = self._merged.setdefault(station, [QuantileSketch(self.k) for _ in range(N_CELLS)])
+            for cell, sketch in cells.items():
+                merged[cell].merge(sketch)
+
+    def _load(self) -> dict:
+        from quantile_sketch import QuantileSketch
+
+        if self._merged is None:
+            self._merged = {}
+            for month in self.months():
+                if self.root is None:
+                    self._fold(self._memory[month])
+                    continue
+                with open(self._month_path(month), encoding="utf-8") as f:
+                    data = json.load(f)
+                self._fold({
+                    station: {int(c): QuantileSketch.from_dict(s) for c, s in cells.items()}
+                    for station, cells in data.items()
+                })
+        return self._merged
+
+    def stations(self) -> list:
+        return sorted(self._load())
+
+    def calibrations(self, station) -> dict:
+        """cal_daytype / cal_time / q_low / q_high / rows for one station,
+        or pooled over several (an iterable of PT_CODEs, as STATIONS)."""
+        import numpy as np
+        from quantile_sketch import QuantileSketch
+
+        merged_all = self._load()
+        names = [station] if isinstance(station, str) else list(station)
+        per_station = [merged_all[s.strip().upper()] for s in names]
+        if len(per_station) == 1:
+            cells = per_station[0]
+        else:
+            cells = [QuantileSketch(self.k) for _ in range(N_CELLS)]
+            for station_cells in per_station:
+                for cell, sketch in zip(cells, station_cells):
+                    cell.merge(sketch)
+
+        def merged(ids):
+            out = QuantileSketch(self.k)
+            for i in ids:
+                out.merge(cells[i])
+            return out
+
+        def normalize(counts):
+            total = sum(counts)
+            return [c / total for c in counts] if total > 0 else [1/3, 1/3, 1/3]
+
+        # CAL_DAYTYPE: thresholds over the two known day types
+        valid = merged([c for pair in DAYTYPE_CELLS for c in pair])
+        q_low, q_high = valid.quantile([LOW_Q, HIGH_Q])
+        cal_daytype = {}
+        for state, pair in zip(DAY_TYPES.values(), DAYTYPE_CELLS):
+            counts = np.sum([_demand_counts(cells[c], q_low, q_high) for c in pair], axis=0)
+            cal_daytype[state] = normalize(counts.tolist())
+
+        # CAL_TIME: thresholds over all of the station's rows
+        t_low, t_high = merged(range(N_CELLS)).quantile([LOW_Q, HIGH_Q])
+        peak = np.sum([_demand_counts(cells[c], t_low, t_high) for c in PEAK_CELLS], axis=0)
+        off_peak = np.sum([_demand_counts(cells[c], t_low, t_high) for c in range(N_CELLS) if c not in PEAK_CELLS], axis=0)
+        cal_time = {"Peak": normalize(peak.tolist()), "Off-Peak": normalize(off_peak.tolist())}
+
+        return {
+            "cal_daytype": cal_daytype,
+            "cal_time": cal_time,
+            "q_low": float(q_low),
+            "q_high": float(q_high),
+            "rows": int(valid.n),
+        }
+
+    def calibrations_all(self) -> dict:
+        return {station: self.calibrations(station) for station in self.stations()}
+
+
+# ----------------------------
+# 10) Inference helper + sample scenarios
+# ----------------------------
+def run_scenario(name: str, evidence: dict, model: CrowdingModel | None = None):
+    if model is None:
+        model = CrowdingModel.from_data()
+    probs = model.crowding(evidence)
     print(f"\nScenario: {name}")
     print("Evidence:", evidence)
-    for state, prob in zip(factor.state_names["Crowding"], factor.values):
+    for state, prob in zip(STATE["Crowding"], probs):
         print(f"  P(Crowding={state}) = {float(prob):.4f}")
-    return factor
+    return probs
 
 # ----------------------------
-# 9) Ten test scenarios (add below your existing ones)
+# 11) Ten test scenarios (add below your existing ones)
 # ----------------------------
 TEST_SCENARIOS = [
     # 1) Worst-case operational stress (Today)
@@ -582,5 +1436,6 @@ TEST_SCENARIOS = [
 ]
 
 if __name__ == "__main__":
+    crowding_model = CrowdingModel.from_data(verbose=True)
     for name, evidence in TEST_SCENARIOS:
-        run_scenario(name, evidence)
+        run_scenario(name, evidence, crowding_model)
@@ -0,0 +1,136 @@
+"""
+Mergeable quantile sketch (KLL-style compactor hierarchy).
+
+Level h holds items of weight 2^h. When a level outgrows its capacity it is
+sorted and every other item is promoted to the next level, so the total
+weight stays exactly n while the sketch keeps O(k log(n/k)) items. Capacities
+shrink geometrically (factor 2/3) below the top level, as in KLL; the choice
+of odd/even items alternates between compactions instead of being random, so
+results are reproducible.
+
+While nothing has been compacted the sketch is exact: quantile() is then
+np.quantile (linear interpolation, the pandas default) and rank() is an exact
+count, so small inputs give the same thresholds as the batch pipeline.
+
+Sketches built over disjoint parts of the data (months, stations, cells) can
+be merged, which is what makes per-month statistics composable.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+DEFAULT_K = 256
+
+
+class QuantileSketch:
+    def __init__(self, k: int = DEFAULT_K, values=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._compactions = 0
+        if values is not None:
+            self.update(values)
+
+    # -------------------------
+    # Building
+    # -------------------------
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, int(self.k * (2 / 3) ** depth))
+
+    def update(self, values) -> "QuantileSketch":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold other into this sketch (other is left unchanged)."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def copy(self) -> "QuantileSketch":
+        out = QuantileSketch(self.k)
+        out.n = self.n
+        out.levels = [items.copy() for items in self.levels]
+        out._compactions = self._compactions
+        return out
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays behind at this level
+                keep = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                offset = self._compactions % 2
+                self._compactions += 1
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    # -------------------------
+    # Queries
+    # -------------------------
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def rank(self, x, inclusive: bool = True) -> float:
+        """(Estimated) number of values <= x (or < x if not inclusive)."""
+        total = 0
+        for h, items in enumerate(self.levels):
+            hits = np.count_nonzero(items <= x) if inclusive else np.count_nonzero(items < x)
+            total += hits << h
+        return total
+
+    def quantile(self, q):
+        """Value(s) at quantile(s) q; NaN when the sketch is empty."""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if self.exact:
+            return np.quantile(self.levels[0], q)
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        weights = weights[order]
+        # an item of weight w stands for w consecutive ranks; interpolate
+        # between the centres of those runs (with unit weights this is
+        # exactly np.quantile's linear interpolation)
+        centres = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(np.asarray(q) * (self.n - 1), centres, values)
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "compactions": self._compactions,
+            "levels": [items.tolist() for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        out = cls(data["k"])
+        out.n = data["n"]
+        out._compactions = data.get("compactions", 0)
+        out.levels = [np.asarray(items, dtype=np.float64) for items in data["levels"]] or [np.empty(0)]
+        return out
@@ -1,3 +1,15 @@
+import hashlib
+import heapq
+import json
+import os
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from sat_solver import CDCLSolver
+
+
 # =====================================================
 # ASSUMPTIONS (derived from the real-world problem)
 # =====================================================
@@ -48,6 +60,7 @@ SUSPENDED = "SUSPENDED"  # Suspended MRT service
 VALID_ROUTE = "VALID_ROUTE"         # Route is allowed
 INVALID_ROUTE = "INVALID_ROUTE"     # Route is not allowed
 CONTRADICTION = "CONTRADICTION"     # Advisory information is inconsistent
+UNDECIDED = "UNDECIDED"             # A resolution limit stopped the search first
 
 
 # =====================================================
@@ -143,38 +156,782 @@ def resolve(c1, c2):
     return None
 
 
-def resolution_entails(clauses, query):
+def is_tautology(clause):
+    # A clause containing both A and ~A is always true
+    # and can never help derive the empty clause.
+    for lit in clause:
+        if negate(lit) in clause:
+            return True
+    return False
+
+
+# -------------------------
+# Bitset clauses
+# -------------------------
+
+# Inside the resolution engine every symbol is interned to one bit,
+# and a clause is a pair of bitmasks (pos, neg):
+#   {"~A", "B"}  ->  (bit(B), bit(A))
+# so complementary literals, resolvents, tautologies, subsumption,
+# equality and hashing are all a few integer operations.
+
+class LiteralTable:
+    # symbol <-> bit mapping for one resolution run
+
+    def __init__(self):
+        self.bit = {}
+        self.symbols = []
+
+    def intern(self, symbol):
+        b = self.bit.get(symbol)
+        if b is None:
+            b = 1 << len(self.symbols)
+            self.bit[symbol] = b
+            self.symbols.append(symbol)
+        return b
+
+    def encode(self, clause):
+        # {"~A", "B"} -> (pos, neg)
+        pos = neg = 0
+        for lit in clause:
+            if lit.startswith("~"):
+                neg |= self.intern(lit[1:])
+            else:
+                pos |= self.intern(lit)
+        return pos, neg
+
+    def decode(self, clause):
+        # (pos, neg) -> {"~A", "B"}
+        pos, neg = clause
+        lits = set()
+        for i, symbol in enumerate(self.symbols):
+            if pos >> i & 1:
+                lits.add(symbol)
+            if neg >> i & 1:
+                lits.add("~" + symbol)
+        return lits
+
+
+def bits(mask):
+    # Yields the set bits of mask, lowest first.
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+
+def clause_size(clause):
+    # number of literals
+    return clause[0].bit_count() + clause[1].bit_count()
+
+
+def resolvents(c1, c2):
+    # Resolvent of two bitset clauses, or None if they do not resolve
+    # (or only resolve into a tautology).
+    p1, n1 = c1
+    p2, n2 = c2
+
+    # Complementary literals: X in one clause and ~X in the other.
+    clash = (p1 & n2) | (n1 & p2)
+
+    # Exactly one complementary pair is required: with two or more,
+    # every resolvent still contains some X and ~X.
+    if clash == 0 or clash & (clash - 1):
+        return None
+
+    # Remove the complementary literals and combine the rest.
+    # (Inputs are never tautologies, so the result is not one either.)
+    return (p1 | p2) & ~clash, (n1 | n2) & ~clash
+
+
+class ClauseStore:
+    # Working clause set for the resolution engine.
+    # Clauses are (pos, neg) bitmask pairs kept in a hashed set
+    # (O(1) duplicate checks), with bit -> clauses indexes for each
+    # polarity used for subsumption checks and for finding resolution partners.
+
+    def __init__(self):
+        self.clauses = set()
+        self.by_pos = {}
+        self.by_neg = {}
+        self.bit_cache = {}
+
+        # admission counters (for ResolutionStats)
+        self.duplicates = 0
+        self.subsumed = 0     # rejected by a stored clause
+        self.removed = 0      # stored clauses dropped by a new one
+
+    def bits(self, mask):
+        # Set bits of mask, cached: the same masks recur constantly.
+        found = self.bit_cache.get(mask)
+        if found is None:
+            found = self.bit_cache[mask] = tuple(bits(mask))
+        return found
+
+    def __contains__(self, clause):
+        return clause in self.clauses
+
+    def admit(self, clause):
+        # Adds clause unless it is a duplicate or subsumed by a stored clause;
+        # stored clauses it subsumes are removed. Returns True if kept.
+        clauses = self.clauses
+        if clause in clauses:
+            self.duplicates += 1
+            return False
+
+        pos, neg = clause
+        pos_bits = self.bits(pos)
+        neg_bits = self.bits(neg)
+        by_pos = self.by_pos
+        by_neg = self.by_neg
+        buckets = [by_pos.get(b, ()) for b in pos_bits]
+        buckets += [by_neg.get(b, ()) for b in neg_bits]
+
+        # Forward subsumption: some stored clause C with C ⊆ clause.
+        # Such a C must contain at least one literal of clause, so either
+        # scan the index sets of clause's literals, or (if cheaper) look up
+        # each of the 2^k sub-clauses of clause directly in the hash set.
+        if 1 << len(buckets) <= sum(map(len, buckets)):
+            p = pos
+            while True:
+                n = neg
+                while True:
+                    if (p, n) in clauses:
+                        self.subsumed += 1
+                        return False
+                    if n == 0:
+                        break
+                    n = (n - 1) & neg
+                if p == 0:
+                    break
+                p = (p - 1) & pos
+        else:
+            for bucket in buckets:
+                for p, n in bucket:
+                    if not (p & ~pos or n & ~neg):
+                        self.subsumed += 1
+                        return False
+
+        # Backward subsumption: stored clauses that strictly contain clause
+        # all contain its rarest literal.
+        if buckets:
+            rarest = min(buckets, key=len)
+            for c in [c for c in rarest if not (pos & ~c[0] or neg & ~c[1])]:
+                self.remove(c)
+                self.removed += 1
+
+        clauses.add(clause)
+        for b in pos_bits:
+            if b in by_pos:
+                by_pos[b].add(clause)
+            else:
+                by_pos[b] = {clause}
+        for b in neg_bits:
+            if b in by_neg:
+                by_neg[b].add(clause)
+            else:
+                by_neg[b] = {clause}
+        return True
+
+    def remove(self, clause):
+        self.clauses.discard(clause)
+        for b in self.bits(clause[0]):
+            self.by_pos[b].discard(clause)
+        for b in self.bits(clause[1]):
+            self.by_neg[b].discard(clause)
+
+    def partners(self, clause):
+        # Stored clauses holding a literal complementary to one in clause.
+        found = set()
+        for b in self.bits(clause[0]):
+            found.update(self.by_neg.get(b, ()))
+        for b in self.bits(clause[1]):
+            found.update(self.by_pos.get(b, ()))
+        return found
+
+
+# -------------------------
+# Limits and statistics
+# -------------------------
+
+# resolution_entails returns True / False, or UNKNOWN when a limit in
+# ResolutionLimits stopped the search before it could decide.
+# UNKNOWN is a non-empty string (truthy): test results with `is True`.
+UNKNOWN = "UNKNOWN"
+
+# One given-clause round of resolution_entails:
+#   given       size of the clause resolved this round
+#   clauses     clauses stored after the round
+#   generated   resolvents produced this round
+#   duplicates  resolvents already stored
+#   subsumed    resolvents rejected as subsumed + stored clauses they subsumed
+#   elapsed_ms  time since the search started
+ResolutionRound = namedtuple(
+    "ResolutionRound",
+    ["round", "given", "clauses", "generated", "duplicates", "subsumed", "elapsed_ms"],
+)
+
+
+class ResolutionLimits:
+    # Any limit left as None is unbounded.
+    # max_clauses  stored clauses
+    # max_rounds   given clauses processed
+    # max_ms       wall time in milliseconds
+
+    def __init__(self, max_clauses=None, max_rounds=None, max_ms=None):
+        self.max_clauses = max_clauses
+        self.max_rounds = max_rounds
+        self.max_ms = max_ms
+
+
+class ResolutionStats:
+    # Filled in by resolution_entails(..., stats=ResolutionStats()).
+
+    def __init__(self, keep_rounds=True):
+        self.keep_rounds = keep_rounds
+        self.rounds = []          # ResolutionRound per round (if keep_rounds)
+        self.num_rounds = 0
+        self.clauses = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.subsumed = 0
+        self.elapsed_ms = 0.0
+        self.result = None        # True, False or UNKNOWN
+        self.limit = None         # "clauses", "rounds" or "time" when UNKNOWN
+
+    def summary(self):
+        text = (
+            "result=%s rounds=%d clauses=%d generated=%d duplicates=%d subsumed=%d time=%.2fms"
+            % (self.result, self.num_rounds, self.clauses, self.generated,
+               self.duplicates, self.subsumed, self.elapsed_ms)
+        )
+        if self.limit is not None:
+            text += " (stopped: %s limit)" % self.limit
+        return text
+
+
+def resolution_entails(clauses, query, limits=None, stats=None):
     # This function checks whether the knowledge base
-    # entails a given query using resolution.
+    # entails a given query using resolution (proof by contradiction).
+    # Returns True / False, or UNKNOWN if one of `limits` was reached
+    # (never without limits). Pass a ResolutionStats to see what it did.
+
+    # Strategy: set-of-support resolution.
+    # - The set of support (SOS) starts from the negated query plus every
+    #   clause with no negative literal (e.g. the scenario facts).
+    #   All other clauses are satisfied by making every symbol false,
+    #   so they are consistent on their own and SOS stays complete.
+    # - Each round only resolves NEW clauses against the clauses seen so far,
+    #   never re-trying a pair.
+    # - Tautologies are dropped; duplicates are rejected by hashing;
+    #   forward/backward subsumption keeps the clause set small.
+    # - Clauses are bitset pairs (see LiteralTable), so the inner loop
+    #   is integer arithmetic only.
+
+    if stats is None:
+        stats = ResolutionStats(keep_rounds=False)
+    if limits is None:
+        limits = ResolutionLimits()
+
+    start = time.perf_counter()
+    deadline = None if limits.max_ms is None else start + limits.max_ms / 1000.0
+    max_clauses = limits.max_clauses
+    max_rounds = limits.max_rounds
+
+    table = LiteralTable()
+    store = ClauseStore()
+    support = []
+
+    def finish(result, limit=None):
+        stats.result = result
+        stats.limit = limit
+        stats.clauses = len(store.clauses)
+        stats.duplicates = store.duplicates
+        stats.subsumed = store.subsumed + store.removed
+        stats.elapsed_ms = (time.perf_counter() - start) * 1000.0
+        return result
+
+    # Step 1: Copy all clauses (smallest first so subsumption prunes early)
+    negated_query = table.encode({negate(query)})
+    initial = {table.encode(c) for c in clauses} | {negated_query}
+    initial = sorted((c for c in initial if not c[0] & c[1]), key=clause_size)
+
+    for c in initial:
+        if c == (0, 0):
+            return finish(True)
+        if store.admit(c) and (c == negated_query or c[1] == 0):
+            support.append(c)
+
+    # Clauses already resolved against (the "old" side of new x old).
+    # Starts as the non-SOS clauses; each given clause joins it once processed.
+    in_support = set(support)
+    active = {c for c in store.clauses if c not in in_support}
+
+    # Step 2: Take each SOS clause once (shortest first, so unit clauses
+    # drive the search) and resolve it against the old clauses only.
+    queue = [(clause_size(c), n, c) for n, c in enumerate(support)]
+    heapq.heapify(queue)
+    counter = len(queue)
+
+    while queue:
+        size, _, given = heapq.heappop(queue)
+
+        # given may have been removed by backward subsumption
+        if given not in store:
+            continue
+
+        if max_rounds is not None and stats.num_rounds >= max_rounds:
+            return finish(UNKNOWN, "rounds")
+        stats.num_rounds += 1
+        generated = 0
+        duplicates = store.duplicates
+        subsumed = store.subsumed + store.removed
+
+        # Only clauses holding a complementary literal can resolve with given.
+        for other in store.partners(given) & active:
+            if other not in store:
+                continue
+            resolvent = resolvents(given, other)
+            if resolvent is None:
+                continue
+            generated += 1
+
+            # If an empty clause is derived,
+            # the query is logically entailed.
+            if resolvent == (0, 0):
+                stats.generated += generated
+                return finish(True)
+
+            if store.admit(resolvent):
+                heapq.heappush(queue, (clause_size(resolvent), counter, resolvent))
+                counter += 1
+                if max_clauses is not None and len(store.clauses) > max_clauses:
+                    stats.generated += generated
+                    return finish(UNKNOWN, "clauses")
+
+            # one round can be long: check the clock every 256 resolvents
+            if deadline is not None and (generated & 255) == 0 and time.perf_counter() > deadline:
+                stats.generated += generated
+                return finish(UNKNOWN, "time")
+
+        if given in store:
+            active.add(given)
+
+        stats.generated += generated
+        now = time.perf_counter()
+        if stats.keep_rounds:
+            stats.rounds.append(ResolutionRound(
+                stats.num_rounds, size, len(store.clauses), generated,
+                store.duplicates - duplicates,
+                store.subsumed + store.removed - subsumed,
+                (now - start) * 1000.0,
+            ))
+        if deadline is not None and now > deadline:
+            return finish(UNKNOWN, "time")
+
+    # Step 3: If the set of support is exhausted,
+    # entailment cannot be proven.
+    return finish(False)
+
+
+def sat_entails(clauses, query):
+    # Alternative backend: KB entails query iff KB ∧ ¬query is unsatisfiable,
+    # checked with the CDCL solver in sat_solver.py.
+    # The clause format ({"~X", "Y"}) is used unchanged.
+    solver = CDCLSolver(clauses)
+    return not solver.solve([negate(query)])
 
-    # Step 1: Copy all clauses
-    clause_list = [set(c) for c in clauses]
 
-    # Step 2: Add the negation of the query
-    # (Inference by contradiction)
-    clause_list.append({negate(query)})
+# =====================================================
+# HORN FRAGMENT (linear-time forward chaining)
+# =====================================================
 
-    while True:
-        new_clauses = []
+def is_horn(clause):
+    # A Horn clause has at most one positive literal:
+    # {~A, ~B, C} is A ∧ B → C,  {~A, ~B} is the constraint ¬(A ∧ B).
+    return sum(1 for lit in clause if not lit.startswith("~")) <= 1
+
+
+def forward_chain(horn_clauses, goal=None):
+    # Counter-based forward chaining (Dowling–Gallier), linear in KB size.
+    # Each clause keeps a count of body atoms not yet inferred;
+    # when it reaches 0 the head is inferred (or, for a constraint
+    # with no head, the KB is inconsistent).
+    # Returns (inferred atoms, conflict). Stops early once goal is inferred.
+
+    count = []
+    head = []
+    watch = {}  # atom -> ids of clauses with that atom in the body
+    agenda = []
+    inferred = set()
+
+    for clause in horn_clauses:
+        body = [lit[1:] for lit in clause if lit.startswith("~")]
+        positive = [lit for lit in clause if not lit.startswith("~")]
+        h = positive[0] if positive else None
+
+        if not body:
+            if h is None:
+                return inferred, True  # empty clause
+            agenda.append(h)
+            continue
+
+        cid = len(count)
+        count.append(len(body))
+        head.append(h)
+        for atom in body:
+            watch.setdefault(atom, []).append(cid)
+
+    while agenda:
+        p = agenda.pop()
+        if p in inferred:
+            continue
+        inferred.add(p)
+        if p == goal:
+            return inferred, False
+
+        for cid in watch.get(p, ()):
+            count[cid] -= 1
+            if count[cid] == 0:
+                if head[cid] is None:
+                    return inferred, True
+                agenda.append(head[cid])
+
+    return inferred, False
+
+
+def horn_entails(clauses, query, fallback=resolution_entails, limits=None):
+    # Answers entailment on the Horn fragment with one propagation pass.
+    # KB ∧ ¬query is unsatisfiable iff forward chaining derives the query
+    # (or, for a negative query ~X, a constraint fires once X is added),
+    # or a constraint fires on the KB itself.
+    # Only KBs with non-Horn clauses fall back to resolution / SAT.
+    # limits (ResolutionLimits) is passed on to the fallback, so the answer
+    # may be UNKNOWN.
+
+    horn = []
+    rest = []
+    for c in clauses:
+        if is_tautology(c):
+            continue
+        (horn if is_horn(c) else rest).append(c)
+
+    if query.startswith("~"):
+        inferred, conflict = forward_chain(horn + [{query[1:]}])
+        if conflict:
+            return True
+        # units derived with X assumed are not consequences of the KB
+        seeds = []
+    else:
+        inferred, conflict = forward_chain(horn, goal=query)
+        if conflict or query in inferred:
+            return True
+        seeds = [{atom} for atom in inferred]
+
+    # The Horn part alone does not prove it. If that is the whole KB the
+    # answer is final; otherwise let the fallback finish, seeded with the
+    # Horn consequences.
+    if not rest:
+        return False
+    if limits is not None:
+        return fallback(list(clauses) + seeds, query, limits=limits)
+    return fallback(list(clauses) + seeds, query)
+
+
+# Entailment backends selectable in run_scenario
+# ("horn" falls back to resolution for non-Horn clauses)
+ENTAILMENT_BACKENDS = {
+    "horn": horn_entails,
+    "resolution": resolution_entails,
+    "sat": sat_entails,
+}
 
-        # Step 3: Resolve every pair of clauses
-        for i in range(len(clause_list)):
-            for j in range(i + 1, len(clause_list)):
-                resolvent = resolve(clause_list[i], clause_list[j])
+# Backends that accept ResolutionLimits (and may answer UNKNOWN)
+LIMITED_BACKENDS = ("horn", "resolution")
 
-                if resolvent is not None:
-                    # If an empty clause is derived,
-                    # the query is logically entailed.
-                    if len(resolvent) == 0:
-                        return True
-                    new_clauses.append(resolvent)
 
-        # Step 4: If no new clauses are produced,
-        # entailment cannot be proven.
-        if all(c in clause_list for c in new_clauses):
-            return False
+# =====================================================
+# COMPILED KNOWLEDGE BASE (reused across scenarios)
+# =====================================================
 
-        clause_list.extend(new_clauses)
+# Minimal unsatisfiable core for an entailed query:
+#   rules  indices into the rule list, ascending
+#   facts  scenario facts, sorted
+Explanation = namedtuple("Explanation", ["rules", "facts"])
+
+
+def minimize_core(rules, rule_ids, facts, query):
+    # Deletion-based core minimisation: drop each element in turn and keep
+    # it out if rules + facts still entail query. The result is minimal:
+    # removing any single remaining rule or fact breaks the proof.
+    rule_ids = set(rule_ids)
+    facts = set(facts)
+
+    def entailed():
+        kb = [rules[i] for i in rule_ids] + [{f} for f in facts]
+        return horn_entails(kb, query, fallback=sat_entails)
+
+    # later rules first, so earlier (more basic) rules are kept on ties
+    for i in sorted(rule_ids, reverse=True):
+        rule_ids.discard(i)
+        if not entailed():
+            rule_ids.add(i)
+    for f in sorted(facts, reverse=True):
+        facts.discard(f)
+        if not entailed():
+            facts.add(f)
+
+    return Explanation(sorted(rule_ids), sorted(facts))
+
+
+class CompiledKB:
+    # Builds the rules once and keeps a propagated state that scenario
+    # facts are pushed onto / popped off as assumptions.
+    #
+    # - Atoms are interned to ints.
+    # - Horn rules are compiled into body counters + head (Dowling–Gallier);
+    #   pushing facts only propagates their consequences: O(affected rules).
+    # - pop() undoes exactly what the matching push() did, via a trail.
+    # - Several queries are answered against the same propagated state.
+    # - Non-Horn rules (none in get_rules() today) go to one CDCL solver,
+    #   queried with the current facts as assumptions.
+    # - Provenance: every inferred atom keeps the rule that inferred it
+    #   (or FACT), and the constraint that fired is kept on conflict, so a
+    #   proof can be read back without searching (see support()).
+
+    FACT = -1   # reason of an atom that was pushed as a fact
+
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = get_rules()
+        self.rules = list(rules)
+
+        self.atom_id = {}
+        self.atoms = []
+        self.watch = []       # atom id -> ids of Horn rules with the atom in the body
+        self.inferred = []    # atom id -> bool
+        self.reason = []      # atom id -> rule id that inferred it, or FACT
+
+        self.head = []        # rule id -> head atom id, or -1 for a constraint
+        self.body = []        # rule id -> body atom ids
+        self.count = []       # rule id -> body atoms not yet inferred
+        self.source = []      # rule id -> index of the clause in rules
+        self.non_horn = []
+
+        base_units = []
+        self.conflict = False
+        self.conflict_rule = -1   # rule id of the constraint that fired
+        self.empty_clause = -1    # index of an empty clause in rules, if any
+
+        for index, clause in enumerate(self.rules):
+            if is_tautology(clause):
+                continue
+            if not is_horn(clause):
+                self.non_horn.append(clause)
+                continue
+
+            body = [self.intern(lit[1:]) for lit in clause if lit.startswith("~")]
+            positive = [lit for lit in clause if not lit.startswith("~")]
+            head = self.intern(positive[0]) if positive else -1
+
+            if not body and head < 0:
+                self.conflict = True
+                self.empty_clause = index
+                continue
+
+            rid = len(self.head)
+            self.head.append(head)
+            self.body.append(body)
+            self.count.append(len(body))
+            self.source.append(index)
+            for a in body:
+                self.watch[a].append(rid)
+            if not body:
+                base_units.append((head, rid))
+
+        self.sat = CDCLSolver(rules) if self.non_horn else None
+
+        # undo information
+        self.trail = []        # atom ids in the order they were inferred
+        self.decremented = []  # rule ids in the order their counters dropped
+        self.frames = []
+        self.facts = []        # facts currently assumed (for the SAT fallback)
+
+        # rules with no body (facts inside the KB) form the base state
+        if not self.conflict:
+            self._propagate(base_units)
+
+    def intern(self, atom):
+        a = self.atom_id.get(atom)
+        if a is None:
+            a = len(self.atoms)
+            self.atom_id[atom] = a
+            self.atoms.append(atom)
+            self.watch.append([])
+            self.inferred.append(False)
+            self.reason.append(self.FACT)
+        return a
+
+    def _propagate(self, seeds):
+        # seeds: (atom id, reason) pairs
+        inferred, watch, count, head = self.inferred, self.watch, self.count, self.head
+        reason, trail, decremented = self.reason, self.trail, self.decremented
+        agenda = list(seeds)
+
+        while agenda:
+            a, why = agenda.pop()
+            if inferred[a]:
+                continue
+            inferred[a] = True
+            reason[a] = why
+            trail.append(a)
+
+            for rid in watch[a]:
+                count[rid] -= 1
+                decremented.append(rid)
+                if count[rid] == 0:
+                    if head[rid] < 0:
+                        self.conflict = True
+                        self.conflict_rule = rid
+                        return
+                    agenda.append((head[rid], rid))
+
+    def push(self, facts):
+        # Assume the given facts (atoms) on top of the current state.
+        # validated before the undo frame is recorded, so a rejected push
+        # leaves the state untouched
+        facts = list(facts)
+        for fact in facts:
+            if fact.startswith("~"):
+                raise ValueError("facts must be positive atoms: " + fact)
+        self.frames.append((len(self.trail), len(self.decremented), self.conflict, self.conflict_rule, len(self.facts)))
+        self.facts.extend(facts)
+        if not self.conflict:
+            # reversed so the agenda (a stack) handles facts in the given order
+            self._propagate([(self.intern(f), self.FACT) for f in reversed(facts)])
+
+    def pop(self):
+        # Retract the facts of the most recent push().
+        trail_len, dec_len, conflict, conflict_rule, facts_len = self.frames.pop()
+        for a in self.trail[trail_len:]:
+            self.inferred[a] = False
+        del self.trail[trail_len:]
+        for rid in self.decremented[dec_len:]:
+            self.count[rid] += 1
+        del self.decremented[dec_len:]
+        self.conflict = conflict
+        self.conflict_rule = conflict_rule
+        del self.facts[facts_len:]
+
+    @contextmanager
+    def assume(self, facts):
+        self.push(facts)
+        try:
+            yield self
+        finally:
+            self.pop()
+
+    def entails(self, query):
+        # Does KB + current facts entail query ("X" or "~X")?
+        if self.conflict:
+            return True
+
+        if query.startswith("~"):
+            # KB ⊨ ~X  iff  KB ∧ X is inconsistent
+            self.push([query[1:]])
+            proven = self.conflict
+            self.pop()
+        else:
+            a = self.atom_id.get(query)
+            proven = a is not None and self.inferred[a]
+
+        if proven or self.sat is None:
+            return proven
+        return not self.sat.solve(self.facts + [negate(query)])
+
+    def classify(self, facts):
+        # run_scenario decision for a fact set:
+        # CONTRADICTION, INVALID_ROUTE or VALID_ROUTE.
+        with self.assume(facts):
+            if self.entails(CONTRADICTION):
+                return CONTRADICTION
+            if self.entails(INVALID_ROUTE):
+                return INVALID_ROUTE
+            return VALID_ROUTE
+
+    def support(self, query):
+        # Reads the proof of query back from the provenance of the current
+        # state: (indices of the rules used, facts used), or None if the
+        # Horn propagation does not prove it (non-Horn rules needed).
+        rule_ids = set()
+        facts = set()
+
+        if query.startswith("~") and not self.conflict:
+            # KB ⊨ ~X: the proof is the conflict reached with X assumed
+            self.push([query[1:]])
+            found = self.support(CONTRADICTION) if self.conflict else None
+            self.pop()
+            if found is not None:
+                found[1].discard(query[1:])
+            return found
+
+        if self.conflict:
+            if self.empty_clause >= 0:
+                return {self.empty_clause}, facts
+            stack = [self.conflict_rule]
+        else:
+            a = self.atom_id.get(query)
+            if a is None or not self.inferred[a]:
+                return None
+            stack = [self.reason[a]] if self.reason[a] != self.FACT else []
+            if not stack:
+                facts.add(query)
+
+        # walk the derivation tree: each rule's body atoms were inferred first
+        seen = set()
+        while stack:
+            rid = stack.pop()
+            if rid in seen:
+                continue
+            seen.add(rid)
+            rule_ids.add(self.source[rid])
+            for a in self.body[rid]:
+                why = self.reason[a]
+                if why == self.FACT:
+                    facts.add(self.atoms[a])
+                else:
+                    stack.append(why)
+
+        return rule_ids, facts
+
+    def explain(self, facts, query):
+        # Minimal unsatisfiable core of rules + facts ∧ ¬query:
+        # Explanation(rule indices, facts). The proof recorded while
+        # propagating gives the starting core (one pass), then
+        # deletion-based minimisation drops every element the proof
+        # does not need, checking only the (small) core each time.
+        facts = sorted(facts)
+        with self.assume(facts):
+            if not self.entails(query):
+                return None
+            found = self.support(query)
+
+        if found is None:
+            rule_ids, core_facts = set(range(len(self.rules))), set(facts)
+        else:
+            rule_ids, core_facts = found
+        return minimize_core(self.rules, rule_ids, core_facts, query)
+
+
+_compiled_kb = None
+
+
+def get_compiled_kb():
+    # Shared CompiledKB over get_rules(), built on first use.
+    global _compiled_kb
+    if _compiled_kb is None:
+        _compiled_kb = CompiledKB()
+    return _compiled_kb
 
 
 # =====================================================
@@ -193,44 +950,509 @@ RULE_EXPLANATIONS = {
 }
 
 
+def describe_rule(clause):
+    # Readable text for one rule: its RULE_EXPLANATIONS entry if there is
+    # one, otherwise the rule written as an implication.
+    body = sorted(lit[1:] for lit in clause if lit.startswith("~"))
+    heads = sorted(lit for lit in clause if not lit.startswith("~"))
+
+    if len(body) == 2:
+        for key in (tuple(body), tuple(reversed(body))):
+            if key in RULE_EXPLANATIONS:
+                return RULE_EXPLANATIONS[key]
+
+    if not body:
+        return " ∨ ".join(heads)
+    if not heads:
+        return "¬(" + " ∧ ".join(body) + ")"
+    return " ∧ ".join(body) + " → " + " ∨ ".join(heads)
+
+
+def format_explanation(explanation, rules, outcome):
+    # The rules of a minimal core that conclude the outcome (or are the
+    # constraint that fired) are the violated rules; the rest are the
+    # derivation steps leading to them.
+    lines = []
+    steps = []
+    for i in explanation.rules:
+        clause = rules[i]
+        text = describe_rule(clause)
+        concludes = outcome in clause or all(lit.startswith("~") for lit in clause)
+        if concludes:
+            lines.append("Violated Rule: " + text)
+        else:
+            steps.append("Derived From: R%d %s" % (i + 1, text))
+    return "\n".join(lines + steps)
+
+
+def explain(facts, outcome=None, kb=None):
+    # Explanation text for the run_scenario outcome of facts
+    # (None for a valid route), from the minimal core of the proof.
+    if kb is None:
+        kb = get_compiled_kb()
+    if outcome is None:
+        outcome = kb.classify(facts)
+    if outcome == VALID_ROUTE:
+        return None
+    core = kb.explain(facts, outcome)
+    if core is None:
+        return None
+    return format_explanation(core, kb.rules, outcome)
+
+
 def explain_violation(facts):
-    for (a, b), text in RULE_EXPLANATIONS.items():
-        if a in facts and b in facts:
-            print("Violated Rule:", text)
-            return
+    text = explain(facts)
+    if text is not None:
+        print(text)
+
+
+# =====================================================
+# DECISION TABLE (precomputed run_scenario outcomes)
+# =====================================================
+
+# Scenario facts only ever use these 9 symbols, so every advisory set is
+# one of 2^9 = 512 combinations. The table stores the run_scenario outcome
+# and explanation for each, indexed by a fact bitmask
+# (bit i set <=> FACT_SYMBOLS[i] is a fact), and is persisted to disk.
+# It is rebuilt automatically when get_rules() (or the symbols /
+# explanations) change, detected through a fingerprint.
+
+FACT_SYMBOLS = [
+    TODAY, FUTURE, USE_T5, USE_TM_CA, TEL_EXT, CRL_EXT,
+    INT_WORKS, REDUCED, SUSPENDED,
+]
+FACT_BIT = {symbol: 1 << i for i, symbol in enumerate(FACT_SYMBOLS)}
+
+# bump when the stored outcome / explanation format changes
+DECISION_TABLE_VERSION = 2
+
+OUTCOMES = [VALID_ROUTE, INVALID_ROUTE, CONTRADICTION]
+
+DECISION_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "decision_table.json")
+
+
+def fact_mask(facts):
+    # {TODAY, USE_T5} -> bitmask; KeyError for a symbol outside FACT_SYMBOLS
+    mask = 0
+    for fact in facts:
+        mask |= FACT_BIT[fact]
+    return mask
+
+
+def rules_fingerprint(rules=None):
+    # Hash of everything the table depends on (order-independent for rules).
+    if rules is None:
+        rules = get_rules()
+    canonical = {
+        "version": DECISION_TABLE_VERSION,
+        "rules": sorted(sorted(clause) for clause in rules),
+        "symbols": FACT_SYMBOLS,
+        "explanations": sorted([a, b, text] for (a, b), text in RULE_EXPLANATIONS.items()),
+    }
+    data = json.dumps(canonical, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class DecisionTable:
+    # outcomes[mask]     -> index into OUTCOMES
+    # explained[mask]    -> index into explanations (0 = no explanation)
+
+    def __init__(self, outcomes, explained, explanations, fingerprint):
+        self.outcomes = outcomes
+        self.explained = explained
+        self.explanations = explanations
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, rules=None):
+        # Evaluates the run_scenario decision for all 512 fact combinations
+        # with one CompiledKB.
+        if rules is None:
+            rules = get_rules()
+        kb = CompiledKB(rules)
+
+        outcomes = bytearray(1 << len(FACT_SYMBOLS))
+        explained = bytearray(len(outcomes))
+        explanations = [None]
+        index = {None: 0}
+
+        for mask in range(len(outcomes)):
+            facts = [s for s in FACT_SYMBOLS if mask & FACT_BIT[s]]
+            outcome = kb.classify(facts)
+            outcomes[mask] = OUTCOMES.index(outcome)
+
+            text = explain(facts, outcome, kb)
+            if text not in index:
+                index[text] = len(explanations)
+                explanations.append(text)
+            explained[mask] = index[text]
+
+        return cls(outcomes, explained, explanations, rules_fingerprint(rules))
+
+    def save(self, path=DECISION_TABLE_PATH):
+        data = {
+            "fingerprint": self.fingerprint,
+            "symbols": FACT_SYMBOLS,
+            "outcomes": "".join(str(o) for o in self.outcomes),
+            "explained": list(self.explained),
+            "explanations": self.explanations,
+        }
+        # write then rename, so a half-written table is never loaded
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DECISION_TABLE_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            bytearray(int(o) for o in data["outcomes"]),
+            bytearray(data["explained"]),
+            data["explanations"],
+            data["fingerprint"],
+        )
+
+    def lookup(self, facts):
+        # (outcome, explanation or None) with one array index
+        mask = fact_mask(facts)
+        return OUTCOMES[self.outcomes[mask]], self.explanations[self.explained[mask]]
+
+    def classify(self, facts):
+        return OUTCOMES[self.outcomes[fact_mask(facts)]]
+
+
+_decision_table = None
+_fingerprint = None
+
+
+def get_decision_table(path=DECISION_TABLE_PATH, refresh=False):
+    # Loads the persisted table, rebuilding (and re-saving) it if it is
+    # missing, unreadable or was built from different rules.
+    # The rules only change with the code, so their fingerprint is computed
+    # once per process (or module reload); refresh=True recomputes it and
+    # re-checks the file.
+    global _decision_table, _fingerprint
+    if refresh or _fingerprint is None:
+        _fingerprint = rules_fingerprint()
+        _decision_table = None
+    fingerprint = _fingerprint
+    if _decision_table is not None:
+        return _decision_table
+
+    table = None
+    try:
+        table = DecisionTable.load(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    if table is None or table.fingerprint != fingerprint or len(table.outcomes) != 1 << len(FACT_SYMBOLS):
+        table = DecisionTable.build()
+        try:
+            table.save(path)
+        except OSError:
+            pass  # read-only location: keep the in-memory table
+
+    _decision_table = table
+    return table
 
 
 # =====================================================
 # SCENARIO RUNNER (decision logic)
 # =====================================================
 
-def run_scenario(name, facts):
+def run_scenario(name, facts, backend="table", limits=None):
+    # backend: "table" (precomputed DecisionTable, see above),
+    # "compiled" (shared CompiledKB, facts pushed as assumptions)
+    # or one of ENTAILMENT_BACKENDS, which rebuild the KB per scenario.
+    # limits (ResolutionLimits) bounds the LIMITED_BACKENDS; if a limit is
+    # hit the scenario is reported as UNDECIDED. The other backends always
+    # finish quickly and ignore it.
+    if backend not in ("table", "compiled") and backend not in ENTAILMENT_BACKENDS:
+        raise ValueError("Unknown backend: " + backend)
+
     print("\n==============================")
     print("Scenario:", name)
     print("Facts:", facts)
 
-    # Combine rules and scenario facts into one knowledge base
-    kb = get_rules()
-    for fact in facts:
-        kb.append({fact})
+    # facts outside FACT_SYMBOLS are not in the table
+    if backend == "table" and not all(fact in FACT_BIT for fact in facts):
+        backend = "compiled"
+
+    explanation = None
+    if backend == "table":
+        outcome, explanation = get_decision_table().lookup(facts)
+    elif backend == "compiled":
+        outcome = get_compiled_kb().classify(facts)
+    else:
+        entails = ENTAILMENT_BACKENDS[backend]
+        options = {"limits": limits} if limits is not None and backend in LIMITED_BACKENDS else {}
+
+        # Combine rules and scenario facts into one knowledge base
+        kb = get_rules()
+        for fact in facts:
+            kb.append({fact})
+
+        # Check for contradictory advisories first,
+        # then route validity (UNKNOWN is truthy, so compare with True)
+        result = entails(kb, CONTRADICTION, **options)
+        if result is True:
+            outcome = CONTRADICTION
+        elif result is UNKNOWN:
+            outcome = UNDECIDED
+        else:
+            result = entails(kb, INVALID_ROUTE, **options)
+            if result is True:
+                outcome = INVALID_ROUTE
+            elif result is UNKNOWN:
+                outcome = UNDECIDED
+            else:
+                outcome = VALID_ROUTE
+
+    if outcome == UNDECIDED:
+        print("Inference Result: UNDECIDED (resolution limit reached)")
+        return
+
+    if outcome != VALID_ROUTE and explanation is None:
+        explanation = explain(facts, outcome)
 
-    # Step 1: Check for contradictory advisories first
-    # If contradictory, do not make any routing decision
-    if resolution_entails(kb, CONTRADICTION):
+    # Step 1: If contradictory, do not make any routing decision
+    if outcome == CONTRADICTION:
         print("Inference Result: CONTRADICTORY ADVISORY SET")
-        explain_violation(facts)
+        if explanation is not None:
+            print(explanation)
         return
 
-    # Step 2: If no contradiction, check route validity
-    if resolution_entails(kb, INVALID_ROUTE):
+    # Step 2: If no contradiction, report route validity
+    if outcome == INVALID_ROUTE:
         print("Inference Result: INVALID ROUTE")
-        explain_violation(facts)
+        if explanation is not None:
+            print(explanation)
         return
 
     # Step 3: Otherwise, the route is valid
     print("Inference Result: VALID ROUTE")
 
 
+# =====================================================
+# BATCH CLASSIFICATION (structured results, no printing)
+# =====================================================
+
+# One classified advisory set:
+#   facts       frozenset of fact symbols
+#   outcome     VALID_ROUTE, INVALID_ROUTE or CONTRADICTION
+#   explanation violated rule(s) and derivation (None for a valid route)
+ScenarioResult = namedtuple("ScenarioResult", ["facts", "outcome", "explanation"])
+
+
+def classify_facts(facts, table=None):
+    # run_scenario's decision for one fact set, returned instead of printed.
+    # Fact sets within FACT_SYMBOLS are a decision table lookup;
+    # anything else goes through the shared CompiledKB.
+    facts = frozenset(facts)
+    if all(fact in FACT_BIT for fact in facts):
+        if table is None:
+            table = get_decision_table()
+        outcome, explanation = table.lookup(facts)
+    else:
+        outcome = get_compiled_kb().classify(facts)
+        explanation = explain(facts, outcome)
+    return ScenarioResult(facts, outcome, explanation)
+
+
+def _init_worker(rules):
+    # Process pool initializer: each worker builds the compiled KB once
+    # (with fork it is inherited from the parent already built).
+    global _compiled_kb
+    if _compiled_kb is None:
+        _compiled_kb = CompiledKB(rules)
+
+
+class ResultCache:
+    # Bounded memo of fact set -> ScenarioResult, least recently used evicted.
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, facts):
+        result = self.entries.get(facts)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(facts)
+        return result
+
+    def put(self, facts, result):
+        self.entries[facts] = result
+        self.entries.move_to_end(facts)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+def classify_batch(fact_sets, workers=None, cache=None, chunk_size=4096):
+    # Classifies an iterable of fact sets (e.g. replayed service notices)
+    # and yields one ScenarioResult per input, in input order.
+    #
+    # - Inputs are read chunk_size at a time, so any length can be streamed.
+    # - Identical fact sets are answered from a bounded memo (cache).
+    # - Cache misses within the decision table are resolved in-process (one
+    #   array index); misses needing inference are spread across a pool of
+    #   `workers` processes, each holding one CompiledKB of the same rules.
+    #   workers=None or 1 keeps everything in this process.
+    if cache is None:
+        cache = ResultCache()
+    table = get_decision_table()
+
+    pool = None
+    if workers is not None and workers > 1:
+        get_compiled_kb()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(get_rules(),))
+
+    try:
+        chunk = []
+        for facts in fact_sets:
+            chunk.append(frozenset(facts))
+            if len(chunk) >= chunk_size:
+                yield from _classify_chunk(chunk, table, cache, pool, workers)
+                chunk = []
+        if chunk:
+            yield from _classify_chunk(chunk, table, cache, pool, workers)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _classify_chunk(chunk, table, cache, pool, workers):
+    results = {}
+    pending = []
+    for facts in chunk:
+        if facts in results:
+            continue
+        result = cache.get(facts)
+        if result is not None:
+            results[facts] = result
+        elif pool is not None and not all(fact in FACT_BIT for fact in facts):
+            results[facts] = None
+            pending.append(facts)
+        else:
+            result = classify_facts(facts, table)
+            cache.put(facts, result)
+            results[facts] = result
+
+    if pending:
+        per_worker = max(1, len(pending) // (workers * 4))
+        for result in pool.map(classify_facts, pending, chunksize=per_worker):
+            cache.put(result.facts, result)
+            results[result.facts] = result
+
+    for facts in chunk:
+        yield results[facts]
+
+
+# =====================================================
+# ADVISORY STREAM (incremental truth maintenance)
+# =====================================================
+
+# Outcome flip reported to subscribers:
+#   event   "assert" or "retract"
+#   fact    the fact the event was about
+#   old     outcome before the event
+#   new     outcome after the event
+OutcomeChange = namedtuple("OutcomeChange", ["event", "fact", "old", "new"])
+
+
+class AdvisoryMonitor:
+    # Keeps the run_scenario outcome of a changing fact set up to date
+    # as advisories are asserted and retracted.
+    #
+    # - Owns one CompiledKB; each asserted fact is one push() frame, so an
+    #   assert only propagates that fact's consequences.
+    # - Retracting a fact pops the frames above it and re-pushes them:
+    #   only consequences of facts asserted after it are re-derived
+    #   (long-lived facts such as TODAY sit at the bottom and are untouched
+    #   by the short-lived advisories coming and going on top).
+    # - The outcome is two O(1) checks on the propagated state.
+    # - subscribe(callback) calls callback(OutcomeChange) whenever the
+    #   outcome flips between VALID_ROUTE, INVALID_ROUTE and CONTRADICTION.
+
+    def __init__(self, rules=None):
+        self.kb = CompiledKB(rules)
+        self.stack = []           # asserted facts, one KB frame each
+        self.subscribers = {}
+        self.next_token = 0
+        self.outcome = self._current_outcome()
+
+    def _current_outcome(self):
+        if self.kb.entails(CONTRADICTION):
+            return CONTRADICTION
+        if self.kb.entails(INVALID_ROUTE):
+            return INVALID_ROUTE
+        return VALID_ROUTE
+
+    def facts(self):
+        return frozenset(self.stack)
+
+    def subscribe(self, callback):
+        # Returns a token for unsubscribe().
+        token = self.next_token
+        self.next_token += 1
+        self.subscribers[token] = callback
+        return token
+
+    def unsubscribe(self, token):
+        self.subscribers.pop(token, None)
+
+    def assert_fact(self, fact):
+        if fact not in self.stack:
+            self.kb.push([fact])
+            self.stack.append(fact)
+            self._update("assert", fact)
+        return self.outcome
+
+    def retract_fact(self, fact):
+        if fact in self.stack:
+            i = self.stack.index(fact)
+            later = self.stack[i + 1:]
+            for _ in range(len(self.stack) - i):
+                self.kb.pop()
+            del self.stack[i:]
+            for f in later:
+                self.kb.push([f])
+                self.stack.append(f)
+            self._update("retract", fact)
+        return self.outcome
+
+    def process(self, events):
+        # events: iterable of ("assert" | "retract", fact).
+        # Yields the outcome after each event.
+        for event, fact in events:
+            if event == "assert":
+                yield self.assert_fact(fact)
+            elif event == "retract":
+                yield self.retract_fact(fact)
+            else:
+                raise ValueError("Unknown advisory event: " + str(event))
+
+    def explain(self):
+        # Explanation text for the current outcome (None if valid).
+        return explain(self.stack, self.outcome, self.kb)
+
+    def _update(self, event, fact):
+        old = self.outcome
+        new = self._current_outcome()
+        if new == old:
+            return
+        self.outcome = new
+        change = OutcomeChange(event, fact, old, new)
+        for callback in list(self.subscribers.values()):
+            callback(change)
+
+
 # =====================================================
 # TEST SCENARIOS (real-world situations)
 # =====================================================
@@ -284,3 +1506,14 @@ if __name__ == "__main__":
         "S8 - Future Mode with T5 Suspended",
         {FUTURE, USE_T5, SUSPENDED}
     )
+
+    # Check: a rejected assert (negative fact) leaves the KB in its base state
+    monitor = AdvisoryMonitor()
+    monitor.assert_fact(TODAY)
+    try:
+        monitor.assert_fact("~" + FUTURE)
+    except ValueError:
+        pass
+    monitor.retract_fact(TODAY)
+    assert not monitor.kb.frames and not monitor.kb.facts, "stray undo frame after a rejected assert"
+    assert monitor.assert_fact(USE_T5) == VALID_ROUTE
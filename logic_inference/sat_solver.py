@@ -0,0 +1,397 @@
+import heapq
+
+
+# =====================================================
+# CDCL SAT SOLVER (alternative entailment backend)
+# =====================================================
+
+# KB entails query  <=>  KB ∧ ¬query is unsatisfiable.
+# Clauses use the same format as logic_inference.py: {"~X", "Y"}.
+#
+# - Literals are interned to ints: variable v -> 2v (X) and 2v + 1 (~X)
+# - Unit propagation with two watched literals per clause
+# - Conflict analysis to the first UIP, clause learning and
+#   non-chronological backjumping
+# - VSIDS-style variable activity with phase saving for decisions
+# - Luby restarts
+# - MiniSat-style assumptions, so one solver (and its learned clauses)
+#   can answer many queries: solve(assumptions=[facts..., ¬query])
+# - "Lucky phase" check: once the assumptions are propagated, if setting the
+#   rest to False satisfies every input clause (rules all have a negative
+#   literal), answer SAT without deciding every remaining variable
+#   (the common "not entailed" case)
+
+RESTART_BASE = 100      # conflicts per Luby unit
+VAR_DECAY = 0.95
+
+
+def luby(i):
+    # i-th element (0-based) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ...
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+class CDCLSolver:
+    def __init__(self, clauses=()):
+        self.var_index = {}   # symbol -> variable id
+        self.symbols = []     # variable id -> symbol
+
+        self.clauses = []     # literal lists (input + learned)
+        self.input_ids = []   # ids of input (non-learned) clauses
+        self.positive_ids = []  # input clauses with no negative literal
+        self.occurs = []      # variable -> ids of input clauses containing it
+        self.watches = []     # literal -> ids of clauses watching it
+
+        self.value = []       # variable -> None / True / False
+        self.level = []       # variable -> decision level it was assigned at
+        self.reason = []      # variable -> clause id that implied it (None for decisions)
+        self.activity = []
+        self.polarity = []    # saved phase (last value)
+
+        self.trail = []
+        self.trail_lim = []   # trail index where each decision level starts
+        self.qhead = 0
+
+        self.order = []       # heap of (-activity, variable), stale entries skipped
+        self.var_inc = 1.0
+
+        self.ok = True        # False once the clauses alone are unsatisfiable
+        self.lucky_tried = False
+        self.lucky = False    # last SAT answer came from lucky_phase
+        self.num_learned = 0
+        self.num_conflicts = 0
+
+        for c in clauses:
+            self.add_clause(c)
+
+    # -------------------------
+    # Literals
+    # -------------------------
+
+    def variable(self, symbol):
+        v = self.var_index.get(symbol)
+        if v is None:
+            v = len(self.symbols)
+            self.var_index[symbol] = v
+            self.symbols.append(symbol)
+            self.watches.append([])
+            self.watches.append([])
+            self.occurs.append([])
+            self.value.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.polarity.append(False)
+            heapq.heappush(self.order, (0.0, v))
+        return v
+
+    def literal(self, lit):
+        # "X" -> 2v, "~X" -> 2v + 1
+        if lit.startswith("~"):
+            return 2 * self.variable(lit[1:]) + 1
+        return 2 * self.variable(lit)
+
+    def lit_value(self, lit):
+        v = self.value[lit >> 1]
+        if v is None:
+            return None
+        return v != bool(lit & 1)
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    # -------------------------
+    # Clauses
+    # -------------------------
+
+    def add_clause(self, clause):
+        # Clauses are added at decision level 0.
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+
+        lits = set()
+        for lit in clause:
+            p = self.literal(lit)
+            if p ^ 1 in lits:
+                return True  # tautology
+            lits.add(p)
+
+        kept = []
+        for p in lits:
+            val = self.lit_value(p)
+            if val is True:
+                return True  # already satisfied at level 0
+            if val is None:
+                kept.append(p)
+
+        if not kept:
+            self.ok = False
+            return False
+
+        if len(kept) == 1:
+            self.enqueue(kept[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+            return self.ok
+
+        cid = len(self.clauses)
+        self.clauses.append(kept)
+        self.input_ids.append(cid)
+        for p in kept:
+            self.occurs[p >> 1].append(cid)
+        if not any(p & 1 for p in kept):
+            self.positive_ids.append(cid)
+        self.watches[kept[0]].append(cid)
+        self.watches[kept[1]].append(cid)
+        return True
+
+    # -------------------------
+    # Assignment / propagation
+    # -------------------------
+
+    def enqueue(self, lit, reason):
+        v = lit >> 1
+        self.value[v] = not (lit & 1)
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        # Returns the id of a conflicting clause, or None.
+        # Invariant: a clause watches its first two literals, and an implied
+        # literal is always moved to position 0 (its reason clause).
+        while self.qhead < len(self.trail):
+            false_lit = self.trail[self.qhead] ^ 1
+            self.qhead += 1
+
+            watchers = self.watches[false_lit]
+            kept = []
+            self.watches[false_lit] = kept
+
+            for i, cid in enumerate(watchers):
+                c = self.clauses[cid]
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], c[0]
+
+                first = c[0]
+                if self.lit_value(first) is True:
+                    kept.append(cid)
+                    continue
+
+                # look for a replacement watch
+                moved = False
+                for k in range(2, len(c)):
+                    if self.lit_value(c[k]) is not False:
+                        c[1], c[k] = c[k], c[1]
+                        self.watches[c[1]].append(cid)
+                        moved = True
+                        break
+                if moved:
+                    continue
+
+                kept.append(cid)
+                if self.lit_value(first) is False:
+                    kept.extend(watchers[i + 1:])
+                    self.qhead = len(self.trail)
+                    return cid
+
+                self.enqueue(first, cid)
+
+        return None
+
+    def cancel_until(self, level):
+        if self.decision_level() <= level:
+            return
+        start = self.trail_lim[level]
+        for i in range(len(self.trail) - 1, start - 1, -1):
+            v = self.trail[i] >> 1
+            self.polarity[v] = self.value[v]
+            self.value[v] = None
+            self.reason[v] = None
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    # -------------------------
+    # Conflict analysis
+    # -------------------------
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.order = [(-a, u) for u, a in enumerate(self.activity) if self.value[u] is None]
+            heapq.heapify(self.order)
+        elif self.value[v] is None:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def analyze(self, confl):
+        # First-UIP learning. Returns (learned clause, backjump level);
+        # learned[0] is the asserting literal.
+        seen = set()
+        learned = [None]
+        path_count = 0
+        p = None
+        index = len(self.trail) - 1
+        current = self.decision_level()
+        cid = confl
+
+        while True:
+            c = self.clauses[cid]
+            for q in (c if p is None else c[1:]):
+                v = q >> 1
+                if v in seen or self.level[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.level[v] >= current:
+                    path_count += 1
+                else:
+                    learned.append(q)
+
+            # next literal of the current level on the trail
+            while (self.trail[index] >> 1) not in seen:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            cid = self.reason[p >> 1]
+            path_count -= 1
+            if path_count == 0:
+                break
+
+        learned[0] = p ^ 1
+
+        if len(learned) == 1:
+            return learned, 0
+
+        # second watch = literal from the highest remaining level
+        best = max(range(1, len(learned)), key=lambda k: self.level[learned[k] >> 1])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, self.level[learned[1] >> 1]
+
+    # -------------------------
+    # Search
+    # -------------------------
+
+    def pick_branch(self):
+        while self.order:
+            neg_act, v = heapq.heappop(self.order)
+            if self.value[v] is None and -neg_act == self.activity[v]:
+                return 2 * v + (0 if self.polarity[v] else 1)
+        return None
+
+    def lucky_phase(self):
+        # True if setting every unassigned variable to False satisfies all
+        # input clauses (learned clauses are implied by them).
+        # A clause with all variables unassigned is then satisfied iff it has a
+        # negative literal, so only all-positive clauses and clauses touching
+        # an assigned variable need checking: cost ~ size of the trail.
+        value = self.value
+        candidates = set(self.positive_ids)
+        for lit in self.trail:
+            candidates.update(self.occurs[lit >> 1])
+
+        for cid in candidates:
+            for p in self.clauses[cid]:
+                v = value[p >> 1]
+                if (v is None and p & 1) or (v is not None and v != bool(p & 1)):
+                    break
+            else:
+                return False
+
+        self.lucky = True
+        return True
+
+    def search(self, max_conflicts, assumptions):
+        # Returns True (SAT), False (UNSAT under assumptions) or None (restart).
+        conflicts = 0
+
+        while True:
+            confl = self.propagate()
+
+            if confl is not None:
+                conflicts += 1
+                self.num_conflicts += 1
+                if self.decision_level() == 0:
+                    self.ok = False
+                    return False
+
+                learned, back_level = self.analyze(confl)
+                self.cancel_until(back_level)
+
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    cid = len(self.clauses)
+                    self.clauses.append(learned)
+                    self.watches[learned[0]].append(cid)
+                    self.watches[learned[1]].append(cid)
+                    self.num_learned += 1
+                    self.enqueue(learned[0], cid)
+
+                self.var_inc /= VAR_DECAY
+                continue
+
+            if conflicts >= max_conflicts:
+                self.cancel_until(0)
+                return None
+
+            # assumptions are decided first, one per level
+            next_lit = None
+            while self.decision_level() < len(assumptions):
+                p = assumptions[self.decision_level()]
+                val = self.lit_value(p)
+                if val is True:
+                    self.trail_lim.append(len(self.trail))
+                elif val is False:
+                    return False
+                else:
+                    next_lit = p
+                    break
+
+            if next_lit is None:
+                if not self.lucky_tried:
+                    self.lucky_tried = True
+                    if self.lucky_phase():
+                        return True
+                next_lit = self.pick_branch()
+                if next_lit is None:
+                    return True
+
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(next_lit, None)
+
+    def solve(self, assumptions=()):
+        # True if the clauses plus the assumption literals are satisfiable.
+        if not self.ok:
+            return False
+
+        assumption_lits = [self.literal(lit) for lit in assumptions]
+        self.cancel_until(0)
+        self.lucky_tried = False
+        self.lucky = False
+
+        restart = 0
+        while True:
+            status = self.search(luby(restart) * RESTART_BASE, assumption_lits)
+            if status is not None:
+                return status
+            restart += 1
+
+    def model(self):
+        # Symbol -> bool for the last satisfying assignment
+        # (after lucky_phase, unassigned variables are False).
+        return {
+            s: bool(self.value[v]) if self.value[v] is not None else (False if self.lucky else self.polarity[v])
+            for v, s in enumerate(self.symbols)
+        }
@@ -0,0 +1,142 @@
+# Crowding-aware edge costs from the Bayesian crowding model.
+#
+# The BN (bayesian_network/Bayesian_Networks.py) gives P(Crowding) per
+# station and context. This module turns those posteriors into one compact
+# array of expected cost multipliers,
+#     multipliers[station, Time, DayType, Mode, Service]
+# built with a single batch query, so SearchAlgorithms.edge_cost_minutes
+# only does indexed lookups at search time.
+#
+# route_planning does not import the BN itself: build() takes a
+# StationRegistry (per-station models, keyed by PT_CODE) or a single
+# CrowdingModel, anything with a crowding_batch(evidence) method.
+
+import itertools
+
+import numpy as np
+
+from graph import coordinates
+
+# Graph station name -> LTA PT_CODE (as in the DataMall ridership CSVs).
+# Interchanges carry every line's code. T5 and Sungei Bedok have no
+# ridership yet; they get the network-wide average (see build).
+STATION_CODES = {
+    "City Hall": "NS25/EW13",
+    "Dhoby Ghaut": "NS24/NE6/CC1",
+    "Orchard": "TE14/NS22",
+    "Marina Bay": "NS27/CE2/TE20",
+    "Promenade": "CC4/DT15",
+    "Gardens by the Bay": "TE22",
+    "Outram Park": "EW16/NE3/TE17",
+    "Harbourfront": "NE1/CC29",
+    "Bishan": "NS17/CC15",
+    "Caldecott": "CC17/TE9",
+    "Serangoon": "NE12/CC13",
+    "Stevens": "DT10",
+    "Paya Lebar": "EW8/CC9",
+    "MacPherson": "CC10/DT26",
+    "Tampines": "EW2/DT32",
+    "Tanah Merah": "EW4",
+    "Expo": "CG1/DT35",
+    "Changi Airport": "CG2",
+    "Punggol": "NE17/PTC",
+    "Pasir Ris": "EW1",
+    "Hougang": "NE14",
+    "Ang Mo Kio": "NS16",
+    "Bright Hill": "TE7",
+}
+
+# BN states along each context axis of the multiplier array
+TIME_BUCKETS = ["Peak", "Off-Peak"]
+DAY_TYPES = ["Weekday", "Weekend"]
+MODES = ["Today", "Future"]
+SERVICES = ["Normal", "Reduced", "Disrupted"]
+CROWDING_STATES = ["Low", "Moderate", "High"]
+
+# Travel-time multiplier per crowding level, on the scale of the old static
+# multipliers (off-peak 1.0, peak 1.3, disrupted 1.5). The edge multiplier is
+# the expectation under P(Crowding | station, context). All are >= 1, so the
+# admissible heuristic scale is unaffected.
+CROWDING_WEIGHTS = {"Low": 1.0, "Moderate": 1.25, "High": 1.5}
+
+# SearchAlgorithms time_of_day -> (Time, Service)
+TIME_OF_DAY_CONTEXT = {
+    "peak": ("Peak", "Normal"),
+    "off_peak": ("Off-Peak", "Normal"),
+    "disrupted": ("Peak", "Disrupted"),
+}
+
+
+class CrowdingMultipliers:
+    """
+    multipliers[i, t, d, m, s] = expected travel-time multiplier at station
+    stations[i] for TIME_BUCKETS[t], DAY_TYPES[d], MODES[m], SERVICES[s].
+    index maps station name -> i.
+    """
+    def __init__(self, stations, multipliers):
+        self.stations = list(stations)
+        self.index = {name: i for i, name in enumerate(self.stations)}
+        self.multipliers = np.asarray(multipliers, dtype=np.float64)
+
+    @classmethod
+    def build(cls, source, stations=None, codes=STATION_CODES, weights=CROWDING_WEIGHTS):
+        """
+        One crowding_batch call over every (station, context) row.
+        source: StationRegistry (rows routed by PT_CODE) or a CrowdingModel
+        (same posteriors for every station). Stations without a code, or
+        whose code the registry does not know, get the mean over the others.
+        """
+        if stations is None:
+            stations = list(coordinates)
+        contexts = list(itertools.product(TIME_BUCKETS, DAY_TYPES, MODES, SERVICES))
+        shape = (len(TIME_BUCKETS), len(DAY_TYPES), len(MODES), len(SERVICES))
+        w = np.array([weights[c] for c in CROWDING_STATES])
+
+        per_station = hasattr(source, "stations")
+        if per_station:
+            known = [s for s in stations if s in codes and codes[s] in source]
+        else:
+            known = list(stations)
+
+        multipliers = np.empty((len(stations),) + shape)
+        if known:
+            evidence = {
+                "Time": [c[0] for _ in known for c in contexts],
+                "DayType": [c[1] for _ in known for c in contexts],
+                "Mode": [c[2] for _ in known for c in contexts],
+                "Service": [c[3] for _ in known for c in contexts],
+            }
+            if per_station:
+                evidence["PT_CODE"] = [codes[s] for s in known for _ in contexts]
+            expected = (source.crowding_batch(evidence) @ w).reshape((len(known),) + shape)
+            fallback = expected.mean(axis=0)
+        else:
+            expected = np.empty((0,) + shape)
+            fallback = np.ones(shape)
+
+        row = {s: i for i, s in enumerate(known)}
+        for i, s in enumerate(stations):
+            multipliers[i] = expected[row[s]] if s in row else fallback
+        return cls(stations, multipliers)
+
+    def lookup(self, station, time="Off-Peak", day_type="Weekday", mode="Today", service="Normal"):
+        return float(self.multipliers[
+            self.index[station],
+            TIME_BUCKETS.index(time),
+            DAY_TYPES.index(day_type),
+            MODES.index(mode),
+            SERVICES.index(service),
+        ])
+
+    def vector(self, time="Off-Peak", day_type="Weekday", mode="Today", service="Normal"):
+        # multiplier per station (in self.stations order) for one context
+        return self.multipliers[
+            :,
+            TIME_BUCKETS.index(time),
+            DAY_TYPES.index(day_type),
+            MODES.index(mode),
+            SERVICES.index(service),
+        ]
+
+    def min(self):
+        return float(self.multipliers.min()) if self.multipliers.size else 1.0
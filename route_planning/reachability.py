@@ -0,0 +1,208 @@
+# Reachability index for route graphs.
+# Lets every search reject an impossible (start, goal) pair in O(1)
+# instead of exploring the whole component before returning None.
+
+
+def _tarjan(nodes, succ):
+    """
+    Iterative Tarjan SCC over the nodes in `nodes` (anything supporting `in`).
+    Edges leaving `nodes` are ignored. SCCs come out sinks first.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    comps = []
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(succ[root]))]
+
+        while work:
+            u, it = work[-1]
+            advanced = False
+            for w in it:
+                if w not in nodes:
+                    continue
+                if w not in index:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(succ[w])))
+                    advanced = True
+                    break
+                if w in on_stack:
+                    low[u] = min(low[u], index[w])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[u])
+
+            if low[u] == index[u]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    comp.append(w)
+                    if w == u:
+                        break
+                comps.append(comp)
+
+    return comps
+
+
+class ReachabilityIndex:
+    """
+    cc    = connected component id per station (edge direction ignored)
+    scc   = strongly connected component id per station
+    reach = bitmask of SCC ids reachable from each SCC (condensation closure)
+
+    reachable(u, v) is a few dict lookups and one bit test.
+    disable_edge() updates the index locally: only the component that
+    contained the edge is re-split, then the (small) closure is rebuilt.
+    """
+    def __init__(self, graph):
+        self.succ = {}
+        self.pred = {}
+        # parallel edges (same pair, different lines) are counted so
+        # closing one line keeps the pair connected
+        self.edge_count = {}
+
+        for u, edges in graph.items():
+            self.succ.setdefault(u, set())
+            self.pred.setdefault(u, set())
+            for v, _, _ in edges:
+                self.succ.setdefault(v, set())
+                self.pred.setdefault(v, set())
+                self.succ[u].add(v)
+                self.pred[v].add(u)
+                self.edge_count[(u, v)] = self.edge_count.get((u, v), 0) + 1
+
+        self.rebuild()
+
+    def rebuild(self):
+        self.cc = {}
+        self._next_cc = 0
+        for u in self.succ:
+            if u not in self.cc:
+                self._label_cc(u, self._next_cc)
+                self._next_cc += 1
+
+        self.scc = {}
+        self.members = {}
+        self._next_scc = 0
+        for comp in _tarjan(self.succ, self.succ):
+            self._add_scc(comp)
+
+        self._rebuild_closure()
+
+    def reachable(self, u, v):
+        cu = self.cc.get(u)
+        cv = self.cc.get(v)
+        if cu is None or cv is None or cu != cv:
+            return False
+        su = self.scc[u]
+        sv = self.scc[v]
+        if su == sv:
+            return True
+        return (self.reach[su] >> sv) & 1 == 1
+
+    def disable_edge(self, u, v):
+        """
+        Remove one u -> v edge. Returns True if reachability may have changed.
+        """
+        key = (u, v)
+        count = self.edge_count.get(key, 0)
+        if count == 0:
+            return False
+        if count > 1:
+            self.edge_count[key] = count - 1
+            return False
+
+        del self.edge_count[key]
+        self.succ[u].discard(v)
+        self.pred[v].discard(u)
+
+        # connected components: only split if u and v lost every link
+        if u not in self.succ[v]:
+            old_cc = self.cc[u]
+            self._label_cc(u, self._next_cc)
+            if self.cc[v] == self._next_cc:
+                # still connected another way, keep the old id
+                self._label_cc(u, old_cc)
+            else:
+                self._next_cc += 1
+
+        # strongly connected components: only the SCC holding the edge can split
+        sid = self.scc[u]
+        if self.scc[v] == sid:
+            nodes = set(self.members[sid])
+            comps = _tarjan(nodes, self.succ)
+            if len(comps) > 1:
+                del self.members[sid]
+                del self.reach[sid]
+                for comp in comps:
+                    self._add_scc(comp)
+
+        self._rebuild_closure()
+        return True
+
+    def _label_cc(self, start, cc_id):
+        self.cc[start] = cc_id
+        stack = [start]
+        while stack:
+            u = stack.pop()
+            for w in self.succ[u] | self.pred[u]:
+                if self.cc.get(w) != cc_id:
+                    self.cc[w] = cc_id
+                    stack.append(w)
+
+    def _add_scc(self, comp):
+        sid = self._next_scc
+        self._next_scc += 1
+        self.members[sid] = comp
+        for u in comp:
+            self.scc[u] = sid
+
+    def _rebuild_closure(self):
+        cond_succ = {}
+        for sid, comp in self.members.items():
+            out = set()
+            for u in comp:
+                for w in self.succ[u]:
+                    out.add(self.scc[w])
+            out.discard(sid)
+            cond_succ[sid] = out
+
+        # post-order over the condensation DAG so successors are done first
+        self.reach = {}
+        for root in cond_succ:
+            if root in self.reach:
+                continue
+            work = [(root, iter(cond_succ[root]))]
+            while work:
+                sid, it = work[-1]
+                pushed = False
+                for d in it:
+                    if d not in self.reach:
+                        work.append((d, iter(cond_succ[d])))
+                        pushed = True
+                        break
+                if pushed:
+                    continue
+                work.pop()
+                mask = 1 << sid
+                for d in cond_succ[sid]:
+                    mask |= self.reach[d]
+                self.reach[sid] = mask
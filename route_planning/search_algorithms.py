@@ -1,7 +1,10 @@
 import heapq
 import math
 import itertools
+import time
 from graph import coordinates
+from reachability import ReachabilityIndex
+from crowding import TIME_OF_DAY_CONTEXT
 
 
 class Node:
@@ -23,9 +26,13 @@ class Node:
 class StackFrontier:
     def __init__(self):
         self.frontier = []
+        # largest number of entries held at once (for memory profiling)
+        self.peak = 0
 
     def add(self, item):
         self.frontier.append(item)
+        if len(self.frontier) > self.peak:
+            self.peak = len(self.frontier)
 
     def empty(self):
         return len(self.frontier) == 0
@@ -51,6 +58,93 @@ class QueueFrontier(StackFrontier):
         return self.frontier.pop(0)
 
 
+class IndexedPriorityQueue:
+    """
+    Binary min-heap with a position index keyed by state id.
+    A queued state gets its priority lowered in place (decrease-key)
+    instead of a duplicate push, so size is bounded by the number of states.
+    Entries are [priority, key, item]; priorities are compared only.
+    """
+    def __init__(self):
+        self.heap = []
+        self.pos = {}  # key -> index in heap
+        self.peak = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return key in self.pos
+
+    def empty(self):
+        return len(self.heap) == 0
+
+    def priority(self, key):
+        return self.heap[self.pos[key]][0]
+
+    def push(self, key, priority, item):
+        if key in self.pos:
+            raise KeyError(f"state already queued: {key!r}")
+        self.heap.append([priority, key, item])
+        self.pos[key] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+        if len(self.heap) > self.peak:
+            self.peak = len(self.heap)
+
+    def decrease_key(self, key, priority, item):
+        # sift both ways: an improved g can round to the same f with a later tie-breaker
+        i = self.pos[key]
+        entry = self.heap[i]
+        entry[0] = priority
+        entry[2] = item
+        self._sift_up(i)
+        self._sift_down(self.pos[key])
+
+    def pop(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.pos[top[1]]
+        if heap:
+            heap[0] = last
+            self.pos[last[1]] = 0
+            self._sift_down(0)
+        return top[1], top[0], top[2]
+
+    def _sift_up(self, i):
+        heap, pos = self.heap, self.pos
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[i] = heap[parent]
+            pos[heap[i][1]] = i
+            i = parent
+        heap[i] = entry
+        pos[entry[1]] = i
+
+    def _sift_down(self, i):
+        heap, pos = self.heap, self.pos
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[i] = heap[child]
+            pos[heap[i][1]] = i
+            i = child
+        heap[i] = entry
+        pos[entry[1]] = i
+
+
 class SearchAlgorithms:
     def __init__(self, graph):
         self.graph = graph
@@ -58,26 +152,120 @@ class SearchAlgorithms:
         # minutes added when line changes between consecutive edges
         self.transfer_penalty = 5
 
+        # static fallback, used until set_crowding() installs BN multipliers
         self.crowding_multiplier = {
             "peak": 1.3,
             "off_peak": 1.0,
             "disrupted": 1.5
         }
 
+        # per-station multipliers (set_crowding):
+        # time_of_day -> list of multipliers indexed by station id
+        self.crowding = None
+        self._crowding_by_time = None
+        self._station_id = None
+
         # convert coordinate distance units into minutes for heuristic
         self.heuristic_min_per_unit = 3.0
 
         # tie-breaker counter for heapq
         self._counter = itertools.count()
 
+        # max frontier size of the last dfs/bfs call (read by the memory profiler)
+        self.last_frontier_peak = 0
+
+        # O(1) rejection of unreachable (start, goal) pairs
+        self.reachability = ReachabilityIndex(graph)
+        self._graph_copied = False
+
+        # cached by admissible_heuristic_scale
+        self._min_minutes_per_unit = None
+
+    def disable_edge(self, u, v, line=None):
+        """
+        Close u -> v (only on `line` if given), e.g. for a service closure.
+        The graph is copied on first use so the shared graph dicts stay intact.
+        Returns the number of edges removed.
+        """
+        if not self._graph_copied:
+            self.graph = {station: list(edges) for station, edges in self.graph.items()}
+            self._graph_copied = True
+
+        kept = []
+        removed = 0
+        for edge in self.graph.get(u, []):
+            if edge[0] == v and (line is None or edge[2] == line):
+                removed += 1
+            else:
+                kept.append(edge)
+        if u in self.graph:
+            self.graph[u] = kept
+
+        for _ in range(removed):
+            self.reachability.disable_edge(u, v)
+        return removed
+
+    def set_crowding(self, multipliers, day_type="Weekday", mode="Today"):
+        """
+        Use BN expected-crowding multipliers (crowding.CrowdingMultipliers)
+        in edge costs: an edge costs base_minutes times the multiplier of the
+        station it leaves, for the time_of_day's (Time, Service) context
+        (crowding.TIME_OF_DAY_CONTEXT) and this day type / mode.
+        The vectors are sliced once here, so edge costs stay list lookups.
+        Pass None to go back to the static crowding_multiplier.
+        """
+        self.crowding = multipliers
+        if multipliers is None:
+            self._crowding_by_time = None
+            self._station_id = None
+            return
+        self._station_id = multipliers.index
+        self._crowding_by_time = {
+            time_of_day: multipliers.vector(time, day_type, mode, service).tolist()
+            for time_of_day, (time, service) in TIME_OF_DAY_CONTEXT.items()
+        }
+
     def heuristic_minutes(self, a, b):
         x1, y1 = coordinates[a]
         x2, y2 = coordinates[b]
         dist = math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
         return dist * self.heuristic_min_per_unit
 
-    def edge_cost_minutes(self, base_minutes, time_of_day="off_peak", transfer=False):
-        mult = self.crowding_multiplier.get(time_of_day, 1.0)
+    def admissible_heuristic_scale(self, time_of_day="off_peak"):
+        """
+        Largest w such that w * heuristic_minutes never overestimates
+        (and is consistent): min minutes per coordinate unit over all edges,
+        divided by heuristic_min_per_unit. heuristic_minutes itself is not
+        admissible on every edge (e.g. Outram Park - Marina Bay).
+        """
+        if self._min_minutes_per_unit is None:
+            ratio = float("inf")
+            for u, edges in self.graph.items():
+                for v, base_minutes, _ in edges:
+                    (x1, y1), (x2, y2) = coordinates[u], coordinates[v]
+                    dist = math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+                    if dist > 0:
+                        ratio = min(ratio, base_minutes / dist)
+            # disable_edge only removes edges, so this stays a valid lower bound
+            self._min_minutes_per_unit = ratio if ratio != float("inf") else 0.0
+
+        if self.crowding is not None:
+            # any edge may use any station's multiplier: bound by the smallest
+            mult = min(1.0, self.crowding.min(), self.crowding_multiplier.get(time_of_day, 1.0))
+        else:
+            mult = min(1.0, self.crowding_multiplier.get(time_of_day, 1.0))
+        return self._min_minutes_per_unit * mult / self.heuristic_min_per_unit
+
+    def edge_cost_minutes(self, base_minutes, time_of_day="off_peak", transfer=False, station=None):
+        # station: the one the edge leaves (used with set_crowding multipliers)
+        mult = None
+        if self._crowding_by_time is not None and station is not None:
+            per_station = self._crowding_by_time.get(time_of_day)
+            i = self._station_id.get(station)
+            if per_station is not None and i is not None:
+                mult = per_station[i]
+        if mult is None:
+            mult = self.crowding_multiplier.get(time_of_day, 1.0)
         cost = base_minutes * mult
         if transfer:
             cost += self.transfer_penalty
@@ -114,7 +302,7 @@ class SearchAlgorithms:
             for nbr, base_minutes, line in self.graph[u]:
                 if nbr == v:
                     transfer = (prev_line is not None and prev_line != line)
-                    total += self.edge_cost_minutes(base_minutes, time_of_day, transfer)
+                    total += self.edge_cost_minutes(base_minutes, time_of_day, transfer, u)
                     prev_line = line
                     found = True
                     break
@@ -126,6 +314,10 @@ class SearchAlgorithms:
 
     # DFS
     def dfs(self, start, goal, max_depth=None, time_of_day="off_peak"):
+        if not self.reachability.reachable(start, goal):
+            self.last_frontier_peak = 0
+            return None, float("inf"), 0
+
         max_depth = len(self.graph)
 
         start_node = Node(state=start)
@@ -139,6 +331,7 @@ class SearchAlgorithms:
             nodes_expanded += 1
 
             if node.state == goal:
+                self.last_frontier_peak = frontier.peak
                 path, _ = self.reconstruct_path(node)
                 return path, self.calculate_path_cost(path, time_of_day), nodes_expanded
 
@@ -158,10 +351,15 @@ class SearchAlgorithms:
                 )
                 frontier.add((child, depth + 1))
 
+        self.last_frontier_peak = frontier.peak
         return None, float("inf"), nodes_expanded
 
     # BFS
     def bfs(self, start, goal, time_of_day="off_peak"):
+        if not self.reachability.reachable(start, goal):
+            self.last_frontier_peak = 0
+            return None, float("inf"), 0
+
         start_node = Node(state=start)
         frontier = QueueFrontier()
         frontier.add(start_node)
@@ -174,6 +372,7 @@ class SearchAlgorithms:
             nodes_expanded += 1
 
             if node.state == goal:
+                self.last_frontier_peak = frontier.peak
                 path, _ = self.reconstruct_path(node)
                 return path, self.calculate_path_cost(path, time_of_day), nodes_expanded
 
@@ -189,71 +388,81 @@ class SearchAlgorithms:
                 )
                 frontier.add(child)
 
+        self.last_frontier_peak = frontier.peak
         return None, float("inf"), nodes_expanded
 
     # GBFS
     def gbfs(self, start, goal, time_of_day="off_peak"):
-        pq = []
+        if not self.reachability.reachable(start, goal):
+            return None, float("inf"), 0
+
+        # keyed by station: h(station) never changes, so a station is queued once
+        pq = IndexedPriorityQueue()
         start_node = Node(state=start)
-        heapq.heappush(pq, (self.heuristic_minutes(start, goal), next(self._counter), start_node))
+        pq.push(start, (self.heuristic_minutes(start, goal), next(self._counter)), start_node)
 
         explored = set()
         nodes_expanded = 0
 
-        while pq:
-            _, _, node = heapq.heappop(pq) #underscore: ignores heuristic and counter
+        while not pq.empty():
+            _, _, node = pq.pop()
             nodes_expanded += 1
 
             if node.state == goal:
                 path, _ = self.reconstruct_path(node)
                 return path, self.calculate_path_cost(path, time_of_day), nodes_expanded
 
-            if node.state in explored:
-                continue
             explored.add(node.state)
 
             for neighbor, base_minutes, line in self.graph[node.state]:
-                if neighbor in explored:
+                if neighbor in explored or neighbor in pq:
                     continue
                 child = Node(
                     state=neighbor,
                     parent=node,
                     action=(node.state, neighbor, base_minutes, line)
                 )
-                heapq.heappush(pq, (self.heuristic_minutes(neighbor, goal), next(self._counter), child))
+                pq.push(neighbor, (self.heuristic_minutes(neighbor, goal), next(self._counter)), child)
 
         return None, float("inf"), nodes_expanded
 
     # A*
-    def a_star(self, start, goal, time_of_day="off_peak"):
+    def a_star(self, start, goal, time_of_day="off_peak", weight=1.0):
+        # weight > 1 inflates h (weighted A*, see weighted_a_star)
+        if not self.reachability.reachable(start, goal):
+            return None, float("inf"), 0
+
         start_node = Node(state=start, g=0.0, line=None)
 
-        pq = []
-        heapq.heappush(pq, (self.heuristic_minutes(start, goal), next(self._counter), start_node))
+        # keyed by (station, line_context); decrease-key replaces duplicate pushes
+        pq = IndexedPriorityQueue()
+        start_key = (start, None)
+        pq.push(start_key, (weight * self.heuristic_minutes(start, goal), next(self._counter)), start_node)
 
-        # best known g for (station, line_context)
-        best_g = {}
+        # best known (tentative) g for (station, line_context)
+        best_g = {start_key: 0.0}
         nodes_expanded = 0
 
-        while pq:
-            _, _, node = heapq.heappop(pq)
+        while not pq.empty():
+            _, _, node = pq.pop()
             nodes_expanded += 1
 
             if node.state == goal:
                 path, _ = self.reconstruct_path(node)
                 return path, node.g, nodes_expanded
 
-            state_key = (node.state, node.line)
-            if state_key in best_g and best_g[state_key] <= node.g:
-                continue
-            best_g[state_key] = node.g
-
             for neighbor, base_minutes, line in self.graph[node.state]:
                 transfer = (node.line is not None and node.line != line)
-                step = self.edge_cost_minutes(base_minutes, time_of_day, transfer)
+                step = self.edge_cost_minutes(base_minutes, time_of_day, transfer, node.state)
                 new_g = node.g + step
-                new_f = new_g + self.heuristic_minutes(neighbor, goal)
 
+                # skip relaxations that don't beat the tentative g
+                state_key = (neighbor, line)
+                if state_key in best_g and best_g[state_key] <= new_g:
+                    continue
+                best_g[state_key] = new_g
+
+                new_f = new_g + weight * self.heuristic_minutes(neighbor, goal)
                 child = Node(
                     state=neighbor,
                     parent=node,
@@ -261,6 +470,245 @@ class SearchAlgorithms:
                     g=new_g,
                     line=line
                 )
-                heapq.heappush(pq, (new_f, next(self._counter), child))
+                if state_key in pq:
+                    pq.decrease_key(state_key, (new_f, next(self._counter)), child)
+                else:
+                    # new state, or a closed one reopened with a lower g
+                    pq.push(state_key, (new_f, next(self._counter)), child)
+
+        return None, float("inf"), nodes_expanded
 
-        return None, float("inf"), nodes_expanded
\ No newline at end of file
+    # Weighted A*
+    def weighted_a_star(self, start, goal, epsilon=0.1, time_of_day="off_peak"):
+        """
+        A* with heuristic_minutes inflated by (1 + epsilon). The cost stays within
+        (1 + epsilon) of what a_star returns when the heuristic is admissible.
+        heuristic_minutes is not admissible everywhere, so use ara_star when a
+        proven bound against the true optimum is needed.
+        """
+        return self.a_star(start, goal, time_of_day=time_of_day, weight=1.0 + epsilon)
+
+    # ARA* (anytime repairing A*)
+    def ara_star(self, start, goal, time_of_day="off_peak", epsilon_start=1.0, epsilon_step=0.25,
+                 time_budget_ms=None, on_improvement=None):
+        """
+        Anytime weighted A*: finds a route fast with h inflated by (1 + epsilon_start),
+        then lowers the weight by epsilon_step and repairs the search, reusing g values,
+        until the route is proven optimal or the wall-clock budget runs out.
+        The last phase uses admissible_heuristic_scale, so given time it is exact.
+
+        Every improvement is (path, cost, bound, elapsed_ms). bound is the proven
+        suboptimality factor cost / min(g + h_adm) over OPEN and INCONS, with h_adm
+        the admissible heuristic (1.0 = optimal).
+        on_improvement(path, cost, bound, elapsed_ms) is called as each one is found.
+
+        Returns (path, cost, nodes_expanded, improvements).
+        """
+        if not self.reachability.reachable(start, goal):
+            return None, float("inf"), 0, []
+
+        t0 = time.perf_counter()
+        deadline = None if time_budget_ms is None else t0 + time_budget_ms / 1000.0
+
+        h_cache = {}
+
+        def h(station):
+            if station not in h_cache:
+                h_cache[station] = self.heuristic_minutes(station, goal)
+            return h_cache[station]
+
+        min_weight = self.admissible_heuristic_scale(time_of_day)
+
+        start_key = (start, None)
+        nodes = {start_key: Node(state=start, g=0.0, line=None)}
+        g = {start_key: 0.0}
+
+        weight = max(min_weight, 1.0 + epsilon_start)
+        open_pq = IndexedPriorityQueue()
+        open_pq.push(start_key, (weight * h(start), next(self._counter)), None)
+        closed = set()
+        incons = set()
+
+        # (goal, line) state holding the best route so far; the start itself when start == goal
+        goal_key = start_key if start == goal else None
+        improvements = []
+        bound = float("inf")
+        nodes_expanded = 0
+        timed_out = False
+
+        while True:
+            goal_g = g[goal_key] if goal_key is not None else float("inf")
+
+            # ImprovePath: expand until no OPEN state can beat the current goal g
+            while not open_pq.empty():
+                if deadline is not None and time.perf_counter() >= deadline:
+                    timed_out = True
+                    break
+                if goal_g <= open_pq.heap[0][0][0]:
+                    break
+
+                key, _, _ = open_pq.pop()
+                closed.add(key)
+                nodes_expanded += 1
+                node = nodes[key]
+
+                if node.state == goal:
+                    continue
+
+                for neighbor, base_minutes, line in self.graph[node.state]:
+                    transfer = (node.line is not None and node.line != line)
+                    new_g = node.g + self.edge_cost_minutes(base_minutes, time_of_day, transfer, node.state)
+
+                    state_key = (neighbor, line)
+                    if state_key in g and g[state_key] <= new_g:
+                        continue
+                    g[state_key] = new_g
+                    nodes[state_key] = Node(
+                        state=neighbor,
+                        parent=node,
+                        action=(node.state, neighbor, base_minutes, line),
+                        g=new_g,
+                        line=line
+                    )
+
+                    if neighbor == goal and new_g < goal_g:
+                        goal_key = state_key
+                        goal_g = new_g
+
+                    if state_key in closed:
+                        incons.add(state_key)
+                        continue
+                    priority = (new_g + weight * h(neighbor), next(self._counter))
+                    if state_key in open_pq:
+                        open_pq.decrease_key(state_key, priority, None)
+                    else:
+                        open_pq.push(state_key, priority, None)
+
+            if goal_key is not None:
+                # any optimal path still has a state with optimal g in OPEN or INCONS
+                lower = min(
+                    (g[k] + min_weight * h(k[0]) for k in itertools.chain(open_pq.pos, incons)),
+                    default=goal_g
+                )
+                new_bound = goal_g / lower if lower > 0 else 1.0
+                new_bound = max(1.0, min(bound, new_bound))
+                if not improvements or goal_g < improvements[-1][1] or new_bound < bound:
+                    path, _ = self.reconstruct_path(nodes[goal_key])
+                    elapsed_ms = (time.perf_counter() - t0) * 1000
+                    improvements.append((path, goal_g, new_bound, elapsed_ms))
+                    if on_improvement is not None:
+                        on_improvement(path, goal_g, new_bound, elapsed_ms)
+                bound = new_bound
+
+            if timed_out or bound <= 1.0 or weight <= min_weight or (open_pq.empty() and not incons):
+                break
+
+            # lower the inflation, move INCONS back to OPEN and re-key everything
+            weight = max(min_weight, weight - epsilon_step)
+            keys = set(open_pq.pos) | incons
+            open_pq = IndexedPriorityQueue()
+            for k in keys:
+                open_pq.push(k, (g[k] + weight * h(k[0]), next(self._counter)), None)
+            incons = set()
+            closed = set()
+
+        if goal_key is None:
+            return None, float("inf"), nodes_expanded, improvements
+
+        path, _ = self.reconstruct_path(nodes[goal_key])
+        return path, g[goal_key], nodes_expanded, improvements
+
+    # Pareto (minutes vs transfers)
+    def pareto_routes(self, start, goal, time_of_day="off_peak"):
+        """
+        Multi-criteria label-setting search over (travel minutes, transfers).
+        Minutes exclude transfer_penalty since transfers are their own criterion.
+        Returns (front, nodes_expanded), front = [(path, lines, minutes, transfers)]
+        sorted by minutes, so transfers strictly decrease along the front.
+
+        Labels are popped in (f, transfers) order. A label is pruned when a settled
+        label at the same (station, line), or a goal label already found, is no
+        worse on both criteria. Goal pruning compares g, not f: heuristic_minutes
+        is not admissible on every edge (e.g. Outram Park - Marina Bay).
+        """
+        if not self.reachability.reachable(start, goal):
+            return [], 0
+
+        # compact label storage: parallel lists indexed by label id
+        lab_state = [start]
+        lab_line = [None]
+        lab_g = [0.0]
+        lab_t = [0]
+        lab_parent = [-1]
+
+        # (f, transfers, label_id); label_id doubles as the tie-breaker
+        pq = [(self.heuristic_minutes(start, goal), 0, 0)]
+
+        # settled non-dominated (g, transfers) per (station, line)
+        settled = {}
+        goal_labels = []
+        nodes_expanded = 0
+
+        def dominated(labels, g, t):
+            for g2, t2 in labels:
+                if g2 <= g and t2 <= t:
+                    return True
+            return False
+
+        while pq:
+            _, t, lid = heapq.heappop(pq)
+            station = lab_state[lid]
+            line = lab_line[lid]
+            g = lab_g[lid]
+            if dominated(goal_labels, g, t):
+                continue
+
+            state_key = (station, line)
+            labels = settled.setdefault(state_key, [])
+            if dominated(labels, g, t):
+                continue
+            labels[:] = [(g2, t2) for g2, t2 in labels if not (g <= g2 and t <= t2)]
+            labels.append((g, t))
+            nodes_expanded += 1
+
+            if station == goal:
+                goal_labels = [(g2, t2) for g2, t2 in goal_labels if not (g <= g2 and t <= t2)]
+                goal_labels.append((g, t))
+                continue
+
+            for neighbor, base_minutes, next_line in self.graph[station]:
+                new_t = t + 1 if (line is not None and line != next_line) else t
+                new_g = g + self.edge_cost_minutes(base_minutes, time_of_day, transfer=False, station=station)
+                if dominated(goal_labels, new_g, new_t):
+                    continue
+                if dominated(settled.get((neighbor, next_line), ()), new_g, new_t):
+                    continue
+
+                lab_state.append(neighbor)
+                lab_line.append(next_line)
+                lab_g.append(new_g)
+                lab_t.append(new_t)
+                lab_parent.append(lid)
+                new_f = new_g + self.heuristic_minutes(neighbor, goal)
+                heapq.heappush(pq, (new_f, new_t, len(lab_state) - 1))
+
+        front = []
+        for lid in range(len(lab_state)):
+            if lab_state[lid] != goal or (lab_g[lid], lab_t[lid]) not in goal_labels:
+                continue
+            if any(r[2] == lab_g[lid] and r[3] == lab_t[lid] for r in front):
+                continue
+            path = []
+            lines = []
+            i = lid
+            while i != -1:
+                path.append(lab_state[i])
+                if lab_line[i] is not None:
+                    lines.append(lab_line[i])
+                i = lab_parent[i]
+            path.reverse()
+            lines.reverse()
+            front.append((path, lines, lab_g[lid], lab_t[lid]))
+
+        front.sort(key=lambda r: r[2])
+        return front, nodes_expanded
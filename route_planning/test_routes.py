@@ -1,7 +1,13 @@
 import time
 import csv
+import sys
+import tracemalloc
 from graph import graph_today, graph_future
-from search_algorithms import SearchAlgorithms
+from search_algorithms import SearchAlgorithms, Node
+from crowding import CrowdingMultipliers
+
+# Run a separate tracemalloc pass after the timing runs (peak / allocated bytes per query)
+PROFILE_MEMORY = True
 
 
 def init_totals():
@@ -160,6 +166,194 @@ def write_today_vs_future_same_pairs_csv(graph_today, graph_future, od_pairs_sam
 
     print(f"CSV saved: {filename}")
 
+def frontier_entry_bytes(algo_name):
+    # Approximate size of one frontier entry: list slot + Node (+ its __dict__)
+    # DFS stores (node, depth) tuples, BFS stores bare nodes
+    node = Node(state="X")
+    size = 8 + sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+    if algo_name == "DFS":
+        size += sys.getsizeof((node, 0))
+    return size
+
+def profile_memory_one(algos, algo_name, start, goal, time_of_day):
+    # tracemalloc must already be started by the caller
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+
+    r = run_one(algos, algo_name, start, goal, time_of_day)
+
+    current, peak = tracemalloc.get_traced_memory()
+
+    frontier_nodes = None
+    frontier_bytes = None
+    if algo_name in ("DFS", "BFS"):
+        frontier_nodes = algos.last_frontier_peak
+        frontier_bytes = frontier_nodes * frontier_entry_bytes(algo_name)
+
+    return {
+        "found": r is not None,
+        "peak_bytes": peak - before,
+        "allocated_bytes": current - before,
+        "frontier_nodes": frontier_nodes,
+        "frontier_bytes": frontier_bytes,
+    }
+
+def run_memory_profile(runs, time_of_day="off_peak", verbose=True):
+    """
+    Memory pass, kept separate from the timing runs so tracemalloc overhead
+    does not leak into the timings.
+    runs = list of (mode_name, graph, od_pairs)
+    Returns per-query rows: (mode, algo, start, goal, result dict)
+    """
+    algorithms = ["DFS", "BFS", "GBFS", "A*"]
+    rows = []
+
+    tracemalloc.start()
+    try:
+        for mode_name, graph, od_pairs in runs:
+            algos = SearchAlgorithms(graph)
+            for start, goal in od_pairs:
+                if verbose:
+                    print(f"\n[{mode_name}] OD Pair: {start} -> {goal}")
+                for algo in algorithms:
+                    m = profile_memory_one(algos, algo, start, goal, time_of_day)
+                    rows.append((mode_name, algo, start, goal, m))
+                    if verbose:
+                        line = f"{algo:<5} Peak: {m['peak_bytes']} B Allocated: {m['allocated_bytes']} B"
+                        if m["frontier_nodes"] is not None:
+                            line += f" Max frontier: {m['frontier_nodes']} nodes (~{m['frontier_bytes']} B)"
+                        print(line)
+    finally:
+        tracemalloc.stop()
+
+    return rows
+
+def write_memory_csv(rows, filename="algorithm_memory_profile.csv"):
+    algorithms = ["DFS", "BFS", "GBFS", "A*"]
+
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "Algorithm",
+            "AvgPeakBytes",
+            "MaxPeakBytes",
+            "AvgAllocatedBytes",
+            "MaxFrontierNodes",
+            "MaxFrontierBytes",
+            "Queries"
+        ])
+
+        for algo in algorithms:
+            ms = [m for (_, a, _, _, m) in rows if a == algo]
+            if not ms:
+                writer.writerow([algo, "", "", "", "", "", 0])
+                continue
+
+            peaks = [m["peak_bytes"] for m in ms]
+            allocs = [m["allocated_bytes"] for m in ms]
+            frontier_nodes = [m["frontier_nodes"] for m in ms if m["frontier_nodes"] is not None]
+            frontier_bytes = [m["frontier_bytes"] for m in ms if m["frontier_bytes"] is not None]
+
+            writer.writerow([
+                algo,
+                round(sum(peaks) / len(peaks), 2),
+                max(peaks),
+                round(sum(allocs) / len(allocs), 2),
+                max(frontier_nodes) if frontier_nodes else "",
+                max(frontier_bytes) if frontier_bytes else "",
+                len(ms)
+            ])
+
+    print(f"CSV saved: {filename}")
+
+def print_pareto_fronts(graph, od_pairs, time_of_day="off_peak", title="PARETO FRONTS (MINUTES vs TRANSFERS)"):
+    algos = SearchAlgorithms(graph)
+
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    for start, goal in od_pairs:
+        t0 = time.perf_counter()
+        front, expanded = algos.pareto_routes(start, goal, time_of_day=time_of_day)
+        t1 = time.perf_counter()
+
+        print(f"\nOD Pair: {start} -> {goal}  (Nodes: {expanded} Time: {round((t1 - t0) * 1000, 3)} ms)")
+        if not front:
+            print("  No route")
+        for path, lines, minutes, transfers in front:
+            print(f"  {round(minutes, 2)} min, {transfers} transfer(s): {path} via {lines}")
+
+def print_unreachable_checks(graph, od_pairs, closures=(), time_of_day="off_peak", title="UNREACHABLE QUERY REJECTION"):
+    # closures = (from_station, to_station, line_or_None) edges to disable first
+    algos = SearchAlgorithms(graph)
+    for u, v, line in closures:
+        algos.disable_edge(u, v, line)
+
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    for start, goal in od_pairs:
+        for algo in ["DFS", "BFS", "GBFS", "A*"]:
+            t0 = time.perf_counter()
+            r = run_one(algos, algo, start, goal, time_of_day)
+            t1 = time.perf_counter()
+            status = "no route" if r is None else f"{round(r['cost'], 2)} min"
+            print(f"{algo:<5} {start} -> {goal}: {status} ({round((t1 - t0) * 1000, 3)} ms)")
+
+def print_bounded_suboptimal(graph, od_pairs, epsilon=0.1, time_budget_ms=5.0, time_of_day="off_peak",
+                             title="WEIGHTED A* / ARA* (BOUNDED SUBOPTIMAL)"):
+    algos = SearchAlgorithms(graph)
+
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    for start, goal in od_pairs:
+        print(f"\nOD Pair: {start} -> {goal}")
+
+        t0 = time.perf_counter()
+        _, cost, expanded = algos.a_star(start, goal, time_of_day=time_of_day)
+        t1 = time.perf_counter()
+        print(f"A*            Cost: {round(cost, 2)} Nodes: {expanded} Time: {round((t1 - t0) * 1000, 3)} ms")
+
+        t0 = time.perf_counter()
+        _, cost, expanded = algos.weighted_a_star(start, goal, epsilon=epsilon, time_of_day=time_of_day)
+        t1 = time.perf_counter()
+        print(f"WA* (e={epsilon})  Cost: {round(cost, 2)} Nodes: {expanded} Time: {round((t1 - t0) * 1000, 3)} ms")
+
+        _, _, expanded, improvements = algos.ara_star(
+            start, goal, time_of_day=time_of_day, time_budget_ms=time_budget_ms
+        )
+        print(f"ARA* (budget {time_budget_ms} ms) Nodes: {expanded}")
+        for _, cost, bound, elapsed_ms in improvements:
+            print(f"  Cost: {round(cost, 2)} Bound: {round(bound, 3)} at {round(elapsed_ms, 3)} ms")
+
+def load_crowding_multipliers():
+    # Per-station BN multipliers, or None if the ridership data / pgmpy is not available
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bayesian_network"))
+    try:
+        from Bayesian_Networks import StationRegistry
+        return CrowdingMultipliers.build(StationRegistry.fit())
+    except (ImportError, FileNotFoundError) as e:
+        print(f"\nCrowding-aware routing skipped: {e}")
+        return None
+
+def print_crowding_aware(graph, od_pairs, multipliers, mode="Today", day_type="Weekday",
+                         title="CROWDING-AWARE A* (BN MULTIPLIERS)"):
+    static = SearchAlgorithms(graph)
+    aware = SearchAlgorithms(graph)
+    aware.set_crowding(multipliers, day_type=day_type, mode=mode)
+
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    for start, goal in od_pairs:
+        for time_of_day in ("off_peak", "peak"):
+            _, cost_static, _ = static.a_star(start, goal, time_of_day=time_of_day)
+            path, cost, expanded = aware.a_star(start, goal, time_of_day=time_of_day)
+            print(f"{start} -> {goal} [{time_of_day}] static: {round(cost_static, 2)} "
+                  f"BN: {round(cost, 2)} Nodes: {expanded} Path: {path}")
+
 def run_tests_and_accumulate(graph, od_pairs, totals, time_of_day="off_peak", verbose=True):
     algos = SearchAlgorithms(graph)
 
@@ -256,4 +450,34 @@ if __name__ == "__main__":
         od_same,
         filename="today_vs_future_same_pairs.csv",
         time_of_day="off_peak"
-    )
\ No newline at end of file
+    )
+    print_pareto_fronts(graph_today, od_today, title="PARETO FRONTS - TODAY MODE")
+    print_pareto_fronts(graph_future, od_future, title="PARETO FRONTS - FUTURE MODE")
+
+    print_bounded_suboptimal(graph_today, od_today, title="WEIGHTED A* / ARA* - TODAY MODE")
+    print_bounded_suboptimal(graph_future, od_future, title="WEIGHTED A* / ARA* - FUTURE MODE")
+
+    # T5 does not exist today; closing Gardens by the Bay's only link cuts it off
+    print_unreachable_checks(graph_today, [("Changi Airport", "T5")], title="UNREACHABLE - T5 IN TODAY MODE")
+    print_unreachable_checks(
+        graph_today,
+        [("Changi Airport", "Gardens by the Bay")],
+        closures=[("Marina Bay", "Gardens by the Bay", None), ("Gardens by the Bay", "Marina Bay", None)],
+        title="UNREACHABLE - MARINA BAY <-> GARDENS BY THE BAY CLOSED"
+    )
+
+    multipliers = load_crowding_multipliers()
+    if multipliers is not None:
+        print_crowding_aware(graph_today, od_same, multipliers, mode="Today", title="CROWDING-AWARE A* - TODAY MODE")
+        print_crowding_aware(graph_future, od_same, multipliers, mode="Future", title="CROWDING-AWARE A* - FUTURE MODE")
+
+    if PROFILE_MEMORY:
+        print("\n" + "=" * 30)
+        print("Memory profile (tracemalloc)")
+        print("=" * 30)
+        mem_rows = run_memory_profile(
+            [("TODAY", graph_today, od_today), ("FUTURE", graph_future, od_future)],
+            time_of_day="off_peak",
+            verbose=True
+        )
+        write_memory_csv(mem_rows, filename="algorithm_memory_profile.csv")